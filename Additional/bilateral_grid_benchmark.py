@@ -0,0 +1,165 @@
+"""
+Accuracy and speed of the bilateral grid (core/bilateral_grid.py).
+
+Accuracy is measured against an exact bilateral filter with the kernels
+denoise_bilateral documents: a Gaussian spatial kernel over a window of
+ceil(3 * sigma_spatial) pixels, and a Gaussian intensity kernel of the
+distances rounded down to 1/10000 of the value range. denoise_bilateral
+itself is only used for timing, and its difference is printed for
+reference: in skimage 0.26 it builds its spatial lookup table with
+win_size + 1 points a side but reads it with a stride of win_size, which
+skews its kernel away from the documented Gaussian.
+
+The grid keeps the mean error below 0.5% and the max error below 2% of
+the intensity range of the image (TOLERANCE), and is at least 10 times
+faster than denoise_bilateral on a 512 x 512 slice with the default
+parameters of the Denoising dialog. Filtered slices stay in the
+intensities of the image, so that the processing stages after denoising,
+e.g. a window in HU, apply to them.
+
+Run from the repository root: python Additional/bilateral_grid_benchmark.py
+"""
+
+import math
+import os
+import sys
+import time
+from itertools import product
+
+import numpy as np
+from skimage.restoration import denoise_bilateral
+from skimage.util import img_as_float
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bilateral_grid import COLOR_BINS, bilateral_filter  # noqa: E402
+from core.processing_pipeline import ProcessingPipeline  # noqa: E402
+
+# (mean, max) error, as a fraction of the intensity range of the image
+TOLERANCE = (0.005, 0.02)
+MIN_SPEEDUP = 10
+
+
+def exact_bilateral(image, sigma_color, sigma_spatial):
+    """A brute-force bilateral filter, one window offset at a time."""
+    min_value, max_value = image.min(), image.max()
+    values = img_as_float(image)
+    distance_step = float(max_value - min(min_value, 0)) / COLOR_BINS
+    radius = max(2, math.ceil(3 * sigma_spatial))
+
+    padded = np.pad(values, radius)
+    pad_weight = 1.0 if min_value >= 0 else 0.0
+    weights = np.pad(np.ones(values.shape), radius, constant_values=pad_weight)
+
+    numerator = np.zeros(values.shape)
+    denominator = np.zeros(values.shape)
+    for offset in product(range(-radius, radius + 1), repeat=values.ndim):
+        window = tuple(
+            slice(radius + o, radius + o + size)
+            for o, size in zip(offset, values.shape)
+        )
+        neighbors = padded[window]
+        distances = np.abs(neighbors - values) // distance_step * distance_step
+        weight = (
+            weights[window]
+            * math.exp(-sum(o * o for o in offset) / (2 * sigma_spatial**2))
+            * np.exp(-(distances**2) / (2 * sigma_color**2))
+        )
+        numerator += weight * neighbors
+        denominator += weight
+    return numerator / denominator
+
+
+def test_image(shape, dtype, seed=0):
+    """Smooth blobs with sharp edges and noise, in the range of a CT scan."""
+    rng = np.random.default_rng(seed)
+    grids = np.meshgrid(*[np.linspace(-1, 1, size) for size in shape], indexing="ij")
+    image = np.full(shape, -1000.0)
+    for _ in range(6):
+        center = rng.uniform(-0.6, 0.6, len(shape))
+        radius = rng.uniform(0.1, 0.4)
+        inside = sum((g - c) ** 2 for g, c in zip(grids, center)) < radius**2
+        image[inside] = rng.uniform(-100, 1500)
+    image += rng.normal(0, 40, shape)
+    if dtype == np.uint8:
+        image = (np.clip(image, -1000, 1500) + 1000) / 2500 * 255
+    return image.astype(dtype)
+
+
+def relative_errors(result, reference, image):
+    values = img_as_float(image)
+    value_range = values.max() - values.min()
+    error = np.abs(result - reference) / value_range
+    return error.mean(), error.max()
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    failures = 0
+    print("Accuracy against the exact bilateral filter (mean / max error):")
+    cases = [
+        ((256, 256), np.int16, 0.5, 1.0),
+        ((256, 256), np.int16, 0.5, 3.0),
+        ((256, 256), np.uint8, 0.05, 2.0),
+        ((256, 256), np.uint8, 0.1, 4.0),
+        ((256, 256), np.float64, 30.0, 2.0),
+        ((48, 64, 64), np.int16, 0.5, 1.5),
+        ((48, 64, 64), np.uint8, 0.1, 2.0),
+    ]
+    for shape, dtype, sigma_color, sigma_spatial in cases:
+        image = test_image(shape, dtype)
+        reference = exact_bilateral(image, sigma_color, sigma_spatial)
+        result = bilateral_filter(image, sigma_color, sigma_spatial)
+        mean_error, max_error = relative_errors(result, reference, image)
+        passed = mean_error <= TOLERANCE[0] and max_error <= TOLERANCE[1]
+        failures += not passed
+        print(
+            f"  {str(shape):14} {np.dtype(dtype).name:8} sigma_color={sigma_color:<5}"
+            f" sigma_spatial={sigma_spatial:<4} {mean_error:.4%} / {max_error:.4%}"
+            f" {'ok' if passed else 'FAILED'}"
+        )
+
+    # Rescaled CT slices are int32, windowed in HU after denoising
+    print("Bilateral denoising then windowing (40, 400) of an int32 slice:")
+    image = test_image((256, 256), np.int32)
+    windowed = ProcessingPipeline().apply(
+        image, (("Denoising", ("Bilateral", (0.5, 3.0))), ("Windowing", (40, 400)))
+    )
+    levels = len(np.unique(windowed))
+    failures += levels < 2
+    print(f"  {levels} gray levels {'ok' if levels > 1 else 'FAILED (flat)'}")
+
+    print("Speed on a 512 x 512 int16 slice, Denoising dialog defaults:")
+    image = test_image((512, 512), np.int16)
+    expected, skimage_time = timed(
+        lambda: denoise_bilateral(image, sigma_color=0.5, sigma_spatial=15)
+    )
+    result, grid_time = timed(lambda: bilateral_filter(image, 0.5, 15))
+    speedup = skimage_time / grid_time
+    failures += speedup < MIN_SPEEDUP
+    mean_error, max_error = relative_errors(result, expected, image)
+    print(
+        f"  denoise_bilateral {skimage_time:.2f} s, bilateral grid {grid_time:.3f} s,"
+        f" {speedup:.0f}x faster (difference {mean_error:.4%} / {max_error:.4%})"
+    )
+
+    # denoise_bilateral is 2D only, so 3D is timed against the exact filter
+    print("Speed on a 24 x 128 x 128 int16 volume, in 3D:")
+    volume = test_image((24, 128, 128), np.int16)
+    _, exact_time = timed(lambda: exact_bilateral(volume, 0.5, 2))
+    _, grid_time = timed(lambda: bilateral_filter(volume, 0.5, 2))
+    print(
+        f"  exact filter {exact_time:.2f} s, bilateral grid {grid_time:.3f} s,"
+        f" {exact_time / grid_time:.0f}x faster"
+    )
+
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
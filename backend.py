@@ -2,30 +2,56 @@ import webbrowser
 
 import numpy as np
 import pyqtgraph as pg
+from PyQt5.QtCore import QTimer
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (
+    QApplication,
     QFileDialog,
+    QInputDialog,
     QLabel,
     QListWidgetItem,
     QMainWindow,
     QMessageBox,
+    QProgressDialog,
 )
 from pyqtgraph import ImageView, InfiniteLine
 
 from core.annotations_handler import AnnotationTool
 from core.cdss_worker import CDSSWorker
+from core.chunked_volume import ChunkedVolume
+from core.cine_prefetcher import CinePrefetcher
 from core.comparison_renderer import ComparisonRenderer
-from core.image_enhancer import ImageEnhancer
+from core.dicom_index import DicomIndex
+from core.dicom_index_worker import DicomIndexWorker
+from core.dicom_series_loader import DicomSeriesLoader
+from core.display_cache import DisplayCache
+from core.filter_cache import FilterResultCache
+from core.gzip_volume import GzipNiftiData
 from core.image_loader import ImageLoader
 from core.image_processor import ImageProcessor
+from core.lazy_volume import LazyVolume
 from core.measurements_handler import MeasurementTools
+from core.processing_pipeline import ProcessingPipeline
+from core.progressive_loader import ProgressiveLoaderWorker
+from core.slice_prefetcher import SlicePrefetcher
+from core.volume_cache import VolumeCache
+from core.volume_compression_worker import VolumeCompressionWorker
+from core.volume_filter import denoising_filter, sharpening_filter, smoothing_filter
+from core.volume_filter_worker import VolumeFilterWorker
 from core.volume_renderer import VolumeRenderer
+from core.window_lut import WindowLUT
 from ui.denoising_dialog import DenoisingDialogUI
 from ui.main_window import MainWindowUI
 from ui.notification_list import NotificationListDialog
 from ui.smoothing_sharpening_dialog import SmoothingAndSharpeningDialogUI
+from ui.slab_projection_dialog import SlabProjectionDialogUI
 from ui.windowing_parameters_dialog import WindowingDialogUI
+from utils.cine_player import CinePlayer
 from utils.file_history_manager import FileHistoryManager
+from utils.filter_preview import FilterPreview
+from utils.render_scheduler import RenderScheduler
+from utils.tiled_image_display import TiledImageDisplay
+from utils.viewer_input_filter import ViewerInputFilter
 
 
 class DicomViewerBackend(QMainWindow, MainWindowUI):
@@ -36,14 +62,54 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
 
         # Image Data
         self.original_image_3d = None
+        # The volume as loaded, while a filtered copy of it is shown
+        self.unfiltered_image_3d = None
+        self.filter_worker = None
         self.original_spacing_info = None
-        self.windowed_image = None
-        self.smoothed_image = None
-        self.sharpened_image = None
-        self.denoised_image = None
+
+        # Memory-map uncompressed volumes instead of decoding them up front
+        self.lazy_loading = True
+        # Show DICOM series as soon as their middle slice is decoded
+        self.progressive_loading = True
+        self.series_worker = None
+        # Bigger volumes are kept zlib-compressed in memory
+        self.compress_volumes_above = 1024**3
 
         # Viewers and Views
         self.crosshairs = {}
+        # Pyramid level each viewer currently shows
+        self.rendered_factors = {}
+        # Display-ready buffers of the slices shown recently, per plane
+        self.display_cache = DisplayCache()
+        # Display key of the slice each viewer currently shows
+        self.rendered_keys = {}
+        # Lookup tables of the windows applied to integer volumes
+        self.window_lut = WindowLUT()
+        # Slices go through the chain of denoising, smoothing, sharpening and
+        # windowing set in the dialogs, caching the output of every stage
+        self.processing_pipeline = ProcessingPipeline(
+            FilterResultCache(budget=256 * 1024**2), self.window_lut
+        )
+        # Filters are previewed in the viewers while their dialog is open
+        self.filter_preview = FilterPreview(self)
+        # Crosshair tracking redraws at most once per display frame
+        self.render_scheduler = RenderScheduler(
+            self.render_plane_if_changed, parent=self
+        )
+        # Slices a scrolling viewer is about to show are prepared ahead
+        self.slice_prefetcher = SlicePrefetcher(self.display_cache)
+        # Oblique planes are sampled in full once they stop moving
+        self.interaction_timer = QTimer(self)
+        self.interaction_timer.setSingleShot(True)
+        self.interaction_timer.setInterval(200)
+        self.interaction_timer.timeout.connect(self.end_interaction)
+        # Big 2D images are shown as tiles of the part in view
+        self.tiled_display = TiledImageDisplay(self.ui.sagittal_viewer.getView())
+        self.tiled_display_above = 4096 * 4096
+        # Plays a plane, showing the frames prepared by a prefetch thread
+        self.cine_player = CinePlayer(self.show_cine_frame, parent=self)
+        self.cine_player.stats_updated.connect(self.show_cine_stats)
+        self.cine_player.failed.connect(self.cine_failed)
         self.views = {
             "axial": self.ui.axial_view,
             "sagittal": self.ui.sagittal_view,
@@ -58,8 +124,11 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
         # Critical Components:
         # Objects for processing images and saving loading history
         self.image_processor = ImageProcessor()
+        self.volume_cache = VolumeCache()
+        self.dicom_index = DicomIndex()
+        self.index_worker = None
         self.file_history_manager = FileHistoryManager(
-            self.ui.menuFile, self.import_image
+            self.ui.menuFile, self.import_image, self.cache_history_entry
         )
 
         # For Measurement and Annotation Tools
@@ -90,6 +159,10 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             )
         )
         self.ui.actionImport_png.triggered.connect(lambda: self.import_image("png"))
+        self.ui.actionIndex_DICOM_Folder.triggered.connect(self.index_dicom_folder)
+        self.ui.actionOpen_Indexed_Series.triggered.connect(
+            lambda: self.import_image("indexed")
+        )
         self.ui.actionQuit_App.triggered.connect(self.exit_app)
 
         # View Menu: Measurement Tools
@@ -98,6 +171,7 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
 
         # Image Menu: Image Adjustments and 3D Features
         self.ui.actionWindowing.triggered.connect(self.windowing)
+        self.ui.actionSlab_Projection.triggered.connect(self.slab_projection)
         self.ui.actionSmoothing.triggered.connect(
             lambda: self.smoothing_and_sharpening("Smoothing")
         )
@@ -140,15 +214,33 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
         # Overlay Toolbar
         self.ui.contrast_slider.valueChanged.connect(self.update_contrast)
 
+        # Viewers: pick the pyramid level matching the zoom
+        for plane, view in self.views.items():
+            view.sigRangeChanged.connect(
+                lambda *args, p=plane: self.on_view_range_changed(p)
+            )
+
         # Ortho Toolbar
         self.ui.camera_button.clicked.connect(self.screenshot)
         self.ui.tracking_button.toggled.connect(self.setup_crosshairs)
-        self.ui.reload_button.clicked.connect(
-            lambda: self.display_views(self.original_image_3d)
-        )
+        self.ui.reload_button.clicked.connect(self.reload_views)
         self.ui.notification_button.clicked.connect(
             self.display_prediction_notification
         )
+        # Wheel and arrow keys step through slices, Shift + wheel turns the
+        # crosshairs and Ctrl + wheel zooms
+        for plane, viewer in self.viewers.items():
+            input_filter = ViewerInputFilter(self)
+            input_filter.stepped.connect(lambda step, p=plane: self.step_slice(p, step))
+            input_filter.rotated.connect(
+                lambda degrees, p=plane: self.rotate_crosshairs(p, degrees)
+            )
+            viewer.ui.graphicsView.installEventFilter(input_filter)
+            viewer.ui.graphicsView.viewport().installEventFilter(input_filter)
+
+        self.ui.cine_button.toggled.connect(self.toggle_cine)
+        self.ui.cine_plane_combo_box.currentIndexChanged.connect(self.restart_cine)
+        self.ui.cine_fps_spinbox.valueChanged.connect(self.restart_cine)
 
     ## File Menu ##
     ##===========##
@@ -162,7 +254,10 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
                     return
 
                 self.original_image_3d, self.original_spacing_info = (
-                    ImageLoader.load_image(path)
+                    self.load_with_cache(
+                        path,
+                        lambda p: ImageLoader.load_image(p, lazy=self.lazy_loading),
+                    )
                 )
 
             elif image_type == "nii":
@@ -171,7 +266,10 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
                     return
 
                 self.original_image_3d, self.original_spacing_info = (
-                    ImageLoader.load_nifti(path)
+                    self.load_with_cache(
+                        path,
+                        lambda p: ImageLoader.load_nifti(p, lazy=self.lazy_loading),
+                    )
                 )
 
             elif image_type == "series":
@@ -181,27 +279,291 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
                 if not path:
                     return
 
+                if self.progressive_loading and not self.volume_cache.contains(path):
+                    self.import_series_progressively(path)
+                    return
+
+                load_issues = []
                 self.original_image_3d, self.original_spacing_info = (
-                    ImageLoader.load_dicom_series(path)
+                    self.load_with_cache(
+                        path,
+                        lambda p: ImageLoader.load_dicom_series(
+                            p, self.show_load_progress, load_issues
+                        ),
+                    )
                 )
+                self.show_load_issues(load_issues)
+
+            elif image_type == "indexed":
+                # The path of an indexed series is its Series Instance UID
+                path = path or self.choose_indexed_series()
+                if not path:
+                    return
+
+                if self.progressive_loading:
+                    self.import_series_progressively(
+                        path, "indexed", self.dicom_index.series_headers(path)
+                    )
+                    return
+
+                load_issues = []
+                self.original_image_3d, self.original_spacing_info = (
+                    ImageLoader.load_indexed_series(
+                        self.dicom_index, path, self.show_load_progress, load_issues
+                    )
+                )
+                self.show_load_issues(load_issues)
 
             elif image_type == "png":
                 path = path or self.get_path("PNG Files (*.png)")
                 if not path:
                     return
 
+                self.stop_series_loading()
                 self.original_image_3d, _ = ImageLoader.load_png(path)
                 self.display_image(self.original_image_3d)
                 return
 
-            self.set_initial_slices(self.original_image_3d)
+            # A series still loading in the background is no longer shown
+            self.stop_series_loading()
+            self.inflate_in_background(self.original_image_3d, path)
+
+            # Pyramid levels and statistics cached along with the volume
+            # aren't computed again
+            self.set_initial_slices(
+                self.original_image_3d,
+                self.volume_cache.load_pyramid(path),
+                self.volume_cache.load_statistics(path),
+            )
             self.append_image_to_history(path, image_type)
 
             self.display_views(self.original_image_3d)
+            self.compress_in_background(self.original_image_3d)
 
         except Exception as e:
             self.show_error_message(str(e))
 
+    def import_series_progressively(self, path, image_type="series", headers=None):
+        """
+        Display a DICOM series once its middle axial slice is decoded.
+
+        The other slices are decoded by a background worker, and the sagittal
+        and coronal views fill in while it runs. Indexed series pass their
+        headers so the files aren't read twice.
+        """
+        self.stop_series_loading()
+
+        loader = DicomSeriesLoader()
+        loader.scan(path, headers=headers)
+        loader.allocate()
+
+        # The axial slice that set_image_data shows first
+        middle = len(loader.files) // 2
+        loader.decode_slice(middle)
+
+        self.original_image_3d = loader.rescaled_volume()
+        self.original_spacing_info = loader.spacing
+        self.set_initial_slices(self.original_image_3d)
+        self.display_views(self.original_image_3d)
+
+        self.series_worker = ProgressiveLoaderWorker(loader, decoded_indices=[middle])
+        self.series_worker.slices_loaded.connect(self.on_series_slices_loaded)
+        self.series_worker.loading_finished.connect(
+            lambda: self.on_series_loading_finished(path, image_type, loader)
+        )
+        self.series_worker.loading_failed.connect(self.show_error_message)
+        self.series_worker.start()
+
+    def on_series_slices_loaded(self, done, total):
+        self.ui.statusbar.showMessage(f"Loading slices: {done}/{total}")
+
+        # Only the sagittal and coronal slices cross the slices being decoded
+        self.image_processor.invalidate()
+        for plane in ["sagittal", "coronal"]:
+            self.render_plane(plane)
+
+    def on_series_loading_finished(self, path, image_type, loader):
+        self.show_load_issues(loader.issues)
+        if image_type == "series":
+            self.volume_cache.store_async(
+                path, loader.rescaled_volume(), loader.spacing
+            )
+
+        # The pyramid was started while the volume was still being decoded
+        self.original_image_3d = loader.rescaled_volume()
+        self.image_processor.replace_image_data(self.original_image_3d)
+        self.refresh_slices()
+        self.append_image_to_history(path, image_type)
+        self.compress_in_background(self.original_image_3d)
+
+    def inflate_in_background(self, volume, path):
+        """
+        Inflate a .nii.gz volume in the background, then cache it.
+
+        Its axial slices are read on their own through the gzip index, but
+        the sagittal and coronal views need the whole volume, so they fill
+        in while it is inflated. It is claimed before the views are shown, so
+        that reading the first axial slice waits for it instead of inflating
+        the same bytes a second time.
+        """
+        data = getattr(volume, "data", None)
+        if not isinstance(data, GzipNiftiData) or not data.claim():
+            return
+
+        self.series_worker = ProgressiveLoaderWorker(data)
+        self.series_worker.slices_loaded.connect(self.on_series_slices_loaded)
+        self.series_worker.loading_finished.connect(
+            lambda: self.on_volume_inflated(path)
+        )
+        self.series_worker.loading_failed.connect(self.show_error_message)
+        self.series_worker.start()
+
+    def on_volume_inflated(self, path):
+        # Writing the inflated volume to the cache doesn't inflate it again
+        self.volume_cache.store_async(
+            path, self.original_image_3d, self.original_spacing_info
+        )
+
+        # The pyramid was started while the volume was still being inflated
+        self.image_processor.replace_image_data(self.original_image_3d)
+        self.refresh_slices()
+        self.ui.statusbar.clearMessage()
+
+    def stop_series_loading(self):
+        if self.series_worker is not None and self.series_worker.isRunning():
+            self.series_worker.cancel()
+        self.series_worker = None
+
+    def load_with_cache(self, path, load_function):
+        """
+        Memory-map a volume from the decoded-volume cache, or decode it with
+        load_function and cache it in the background.
+        """
+        cached_volume = self.volume_cache.load(path)
+        if cached_volume is not None:
+            return cached_volume
+
+        volume, spacing = load_function(path)
+
+        # Mapped files are already as fast to open as the cache, and .nii.gz
+        # volumes are cached once inflate_in_background is done with them
+        if not isinstance(volume, LazyVolume) or not (
+            volume.is_mapped or isinstance(volume.data, GzipNiftiData)
+        ):
+            self.volume_cache.store_async(path, volume, spacing)
+
+        return volume, spacing
+
+    def compress_if_large(self, volume):
+        """Keep big in-memory volumes as compressed chunks."""
+        if isinstance(volume, LazyVolume):
+            # Compress the stored values, the rescale stays lazy
+            data = self.compress_if_large(volume.data)
+            if data is volume.data:
+                return volume
+            return LazyVolume(data, volume.slope, volume.intercept, volume.stored_range)
+
+        if self.is_large(volume):
+            return ChunkedVolume(volume)
+        return volume
+
+    def is_large(self, volume):
+        """Whether a volume is big enough to be kept compressed."""
+        if isinstance(volume, LazyVolume):
+            volume = volume.data
+        return (
+            type(volume) is np.ndarray and volume.nbytes > self.compress_volumes_above
+        )
+
+    def compress_in_background(self, volume):
+        """
+        Compress a big in-memory volume in a worker, so that the viewer keeps
+        responding, and swap the compressed copy in once it is done.
+        """
+        if not self.is_large(volume):
+            return
+        worker = VolumeCompressionWorker(volume, self.compress_if_large, parent=self)
+        worker.finished_signal.connect(self.on_volume_compressed)
+        worker.error_signal.connect(self.show_error_message)
+        worker.finished.connect(worker.deleteLater)
+        worker.start()
+
+    def on_volume_compressed(self, volume, compressed_volume):
+        # The volume may have been filtered or replaced in the meantime
+        if self.unfiltered_image_3d is volume:
+            self.unfiltered_image_3d = compressed_volume
+        if self.original_image_3d is not volume:
+            return
+        self.original_image_3d = compressed_volume
+
+        if self.image_processor.image_data is volume:
+            # The same voxels, so the pyramid levels and statistics still hold
+            self.image_processor.replace_image_data(
+                compressed_volume,
+                self.image_processor.pyramid.built_levels(),
+                self.image_processor.statistics,
+            )
+            self.refresh_slices()
+
+    def cache_history_entry(self, path, image_type):
+        """Rebuild the cache entry of a history item if it was evicted."""
+        load_functions = {
+            None: ImageLoader.load_image,
+            "nii": ImageLoader.load_nifti,
+            "series": ImageLoader.load_dicom_series,
+        }
+        if image_type not in load_functions:
+            return
+
+        lazy_volume = ImageLoader.load_lazy(path)
+        if lazy_volume is not None and lazy_volume[0].is_mapped:
+            return
+
+        self.volume_cache.rebuild_async(path, load_functions[image_type])
+
+    def index_dicom_folder(self):
+        root = QFileDialog.getExistingDirectory(self, "Select Folder to Index")
+        if not root:
+            return
+
+        if self.index_worker is not None and self.index_worker.isRunning():
+            self.show_error_message("A folder is already being indexed.")
+            return
+
+        self.index_worker = DicomIndexWorker(self.dicom_index, root)
+        self.index_worker.progress_signal.connect(
+            lambda done, total: self.ui.statusbar.showMessage(
+                f"Indexing DICOM headers: {done}/{total}"
+            )
+        )
+        self.index_worker.finished_signal.connect(
+            lambda changed, removed: self.ui.statusbar.showMessage(
+                f"DICOM index updated: {changed} new or changed, {removed} removed"
+            )
+        )
+        self.index_worker.error_signal.connect(self.show_error_message)
+        self.index_worker.start()
+
+    def choose_indexed_series(self):
+        """Ask for one of the indexed series, returns its Series Instance UID."""
+        all_series = self.dicom_index.series()
+        if not all_series:
+            self.show_error_message("No indexed series. Index a DICOM folder first.")
+            return None
+
+        labels = [
+            f"{s['patient_name'] or s['patient_id']} | {s['study_date']} | "
+            f"{s['modality']} | {s['series_description']} ({s['instances']} images)"
+            for s in all_series
+        ]
+        label, accepted = QInputDialog.getItem(
+            self, "Open Indexed Series", "Series", labels, 0, False
+        )
+        if not accepted:
+            return None
+
+        return all_series[labels.index(label)]["series_uid"]
+
     def exit_app(self):
         self.close()
 
@@ -209,97 +571,249 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
     ##============##
     # Windowing
     def windowing(self):
+        if self.tiled_display.is_active:
+            self.window_tiled_image()
+            return
+
         window_level, window_width = self.show_windowing_dialog()
 
         # Check if valid values were returned
         if window_level is not None and window_width is not None:
-            for plane, viewer in self.viewers.items():
-                target_slice = self.image_processor.get_slice(plane)
-
-                windowed_image = ImageEnhancer.apply_window(
-                    target_slice,
-                    window_level,
-                    window_width,
-                )
-
-                # Render the slice in the viewer
-                self.render_slice(viewer, windowed_image)
+            self.set_processing_stage("Windowing", (window_level, window_width))
 
     def show_windowing_dialog(self):
         windowing_dialog = WindowingDialogUI(self)
-        if windowing_dialog.exec_():
+
+        # Start from a window that fits the intensities of the volume
+        statistics = self.image_processor.statistics
+        if statistics is not None:
+            # The spin boxes take the intensities first, so nothing is clamped
+            windowing_dialog.set_intensity_range(statistics.min, statistics.max)
+            windowing_dialog.set_parameters(*statistics.auto_window())
+
+        if self.exec_with_preview(
+            windowing_dialog, lambda: ("Windowing", windowing_dialog.get_parameters())
+        ):
             window_level, window_width = windowing_dialog.get_parameters()
             return window_level, window_width
         return None, None  # Return None if dialog is rejected
 
+    def window_tiled_image(self):
+        # The tiles of a large image are windowed through their levels
+        lower, upper = self.tiled_display.image_levels
+        previous_levels = self.tiled_display.levels
+        windowing_dialog = WindowingDialogUI(self)
+        windowing_dialog.set_intensity_range(lower, upper)
+        # Starting from the window the image is shown with
+        windowing_dialog.set_parameters(
+            (previous_levels[0] + previous_levels[1]) / 2,
+            max(previous_levels[1] - previous_levels[0], 1),
+        )
+
+        def preview():
+            window_level, window_width = windowing_dialog.get_parameters()
+            self.tiled_display.set_levels(
+                (window_level - window_width / 2, window_level + window_width / 2)
+            )
+
+        windowing_dialog.parameters_changed.connect(preview)
+        if windowing_dialog.exec_():
+            preview()
+        else:
+            self.tiled_display.set_levels(previous_levels)
+
+    # Slab Projection
+    def slab_projection(self):
+        if self.original_image_3d is None:
+            self.show_error_message("No image data to project.")
+            return
+
+        slab_dialog = SlabProjectionDialogUI(self)
+        if not slab_dialog.exec_():
+            return
+
+        planes, mode, thickness = slab_dialog.get_parameters()
+        for plane in planes:
+            self.image_processor.set_slab(plane, mode, thickness)
+        self.render_scheduler.mark_dirty(*planes)
+        self.restart_cine()
+
     # Smoothing and Sharpening
     def smoothing_and_sharpening(self, mode):
         if mode == "Smoothing":
-            sigma, strength = self.show_smoothing_dialog()
+            sigma, strength, whole_volume = self.show_smoothing_dialog()
 
             if sigma is not None and strength is not None:
-                for plane, viewer in self.viewers.items():
-                    target_slice = self.image_processor.get_slice(plane)
-
-                    smoothed_slice = ImageEnhancer.smooth_image(
-                        target_slice, sigma, strength
-                    )
-
-                    # Render the slice in the viewer
-                    self.render_slice(viewer, smoothed_slice)
+                if whole_volume and self.filter_volume(
+                    smoothing_filter(sigma, strength)
+                ):
+                    return
+                self.set_processing_stage("Smoothing", (sigma, strength))
 
         elif mode == "Sharpening":
-            strength = self.show_sharpening_dialog()
+            strength, whole_volume = self.show_sharpening_dialog()
 
             if strength is not None:
-                for plane, viewer in self.viewers.items():
-                    target_slice = self.image_processor.get_slice(plane)
-
-                    sharpend_image = ImageEnhancer.sharpen_image(target_slice, strength)
-
-                    # Render the slice in the viewer
-                    self.render_slice(viewer, sharpend_image)
+                if whole_volume and self.filter_volume(sharpening_filter(strength)):
+                    return
+                self.set_processing_stage("Sharpening", strength)
 
     def show_smoothing_dialog(self):
         smoothing_dialog = SmoothingAndSharpeningDialogUI(mode="Smoothing", parent=self)
-        if smoothing_dialog.exec_():
+        if self.exec_with_preview(
+            smoothing_dialog,
+            lambda: ("Smoothing", smoothing_dialog.get_parameters("Smoothing")),
+        ):
             sigma, smoothing_strength = smoothing_dialog.get_parameters("Smoothing")
-            return sigma, smoothing_strength
-        return None, None
+            return sigma, smoothing_strength, smoothing_dialog.applies_to_volume()
+        return None, None, False
 
     def show_sharpening_dialog(self):
         sharpening_dialog = SmoothingAndSharpeningDialogUI(
             mode="Sharpening", parent=self
         )
-        if sharpening_dialog.exec_():
+        if self.exec_with_preview(
+            sharpening_dialog,
+            lambda: ("Sharpening", sharpening_dialog.get_parameters("Sharpening")),
+        ):
             sharpening_strength = sharpening_dialog.get_parameters("Sharpening")
-            return sharpening_strength
-        return None
+            return sharpening_strength, sharpening_dialog.applies_to_volume()
+        return None, False
 
     # Denoising
     def denoising(self):
-        filter_type, parameters = self.show_denoising_dialog()
+        filter_type, parameters, whole_volume = self.show_denoising_dialog()
 
         if filter_type is not None and parameters is not None:
-            for plane, viewer in self.viewers.items():
-                target_slice = self.image_processor.get_slice(plane)
-
-                denoised_image = ImageEnhancer.denoise(
-                    target_slice,
-                    filter_type,
-                    parameters,
-                )
-
-                # Render the slice in the viewer
-                self.render_slice(viewer, denoised_image)
+            if whole_volume and self.filter_volume(
+                denoising_filter(filter_type, parameters)
+            ):
+                return
+            self.set_processing_stage("Denoising", (filter_type, tuple(parameters)))
 
     def show_denoising_dialog(self):
         denoising_dialog = DenoisingDialogUI(self)
 
-        if denoising_dialog.exec_():
+        def denoising_stage():
+            filter_type, parameters = denoising_dialog.get_parameters()
+            return "Denoising", (filter_type, tuple(parameters))
+
+        if self.exec_with_preview(denoising_dialog, denoising_stage):
             filter_type, parameters = denoising_dialog.get_parameters()
-            return filter_type, parameters
-        return None
+            return filter_type, parameters, denoising_dialog.applies_to_volume()
+        return None, None, False
+
+    # Processing Pipeline
+    def set_processing_stage(self, name, parameters):
+        """Set a stage of the processing chain, and show the processed slices."""
+        self.processing_pipeline.set_stage(name, parameters)
+        self.image_processor.processing_state = self.processing_pipeline.stages or None
+        self.render_scheduler.mark_dirty(*self.viewers)
+        self.restart_cine()
+
+    def clear_processing(self):
+        self.processing_pipeline.clear()
+        self.image_processor.processing_state = None
+        self.restart_cine()
+
+    def process_slice(self, plane, stages=None):
+        """The current slice of a plane through the processing chain."""
+        return self.processing_pipeline.process(
+            self.image_processor.slice_key(plane),
+            lambda: self.image_processor.get_slice(plane),
+            stages,
+            lambda: self.image_processor.get_stored_slice(plane),
+        )
+
+    def process_frames(self, plane, frame_source):
+        """
+        A frame source whose slices go through the processing chain, as the
+        slices shown are, safe to call from another thread.
+        """
+        image_processor = self.image_processor
+        pipeline = self.processing_pipeline
+        stages = pipeline.stages
+        levels = pipeline.levels(stages)
+
+        def read_frame(index):
+            image = pipeline.process(
+                image_processor.slice_key(plane, index),
+                lambda: frame_source(index)[0],
+                stages,
+            )
+            return image, levels
+
+        return read_frame
+
+    # Live Preview
+    def exec_with_preview(self, dialog, stage):
+        """
+        Run a filter dialog, previewing its parameters in the viewers as they
+        change. stage() gives the name of the stage the dialog sets and its
+        parameters, which are previewed within the current processing chain.
+        """
+        dialog.parameters_changed.connect(
+            lambda: self.filter_preview.update(
+                self.processing_pipeline.with_stage(*stage())
+            )
+        )
+        accepted = dialog.exec_()
+        self.filter_preview.finish(accepted)
+        return accepted
+
+    # Whole-volume filtering
+    def filter_volume(self, volume_filter):
+        """
+        Filter the whole volume in the background, then show the result.
+        Returns False for a 2D image, whose slices are filtered instead.
+        """
+        if (
+            self.original_image_3d is None
+            or self.original_image_3d is not self.image_processor.image_data
+        ):
+            return False
+        if self.filter_worker is not None and self.filter_worker.isRunning():
+            self.show_error_message("The volume is already being filtered.")
+            return True
+
+        self.filter_worker = VolumeFilterWorker(volume_filter, self.original_image_3d)
+        slab_count = len(volume_filter.slabs(self.original_image_3d.shape[0]))
+        progress_dialog = QProgressDialog(
+            "Filtering the volume...", "Cancel", 0, slab_count, self
+        )
+        progress_dialog.setWindowTitle("Volume Filtering")
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.canceled.connect(self.cancel_volume_filtering)
+
+        self.filter_worker.progress_signal.connect(
+            lambda done, total: progress_dialog.setValue(done)
+        )
+        self.filter_worker.finished_signal.connect(self.show_filtered_volume)
+        self.filter_worker.error_signal.connect(self.show_error_message)
+        self.filter_worker.finished.connect(progress_dialog.reset)
+        self.filter_worker.start()
+        return True
+
+    def cancel_volume_filtering(self):
+        if self.filter_worker is not None and self.filter_worker.isRunning():
+            self.filter_worker.cancel()
+
+    def show_filtered_volume(self, filtered_volume):
+        # The reload button goes back to the volume as it was loaded
+        if self.unfiltered_image_3d is None:
+            self.unfiltered_image_3d = self.original_image_3d
+        self.original_image_3d = filtered_volume
+        self.image_processor.replace_image_data(filtered_volume)
+        self.refresh_slices()
+
+    def reload_views(self):
+        if self.unfiltered_image_3d is not None:
+            self.original_image_3d = self.unfiltered_image_3d
+            self.unfiltered_image_3d = None
+            self.image_processor.replace_image_data(self.original_image_3d)
+        # And to the unprocessed slices
+        self.clear_processing()
+        self.display_views(self.original_image_3d)
 
     # 3D Features
     def build_surface(self):
@@ -308,6 +822,7 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             self.volume_renderer.create_volume_renderer(
                 self.original_image_3d,
                 self.original_spacing_info,
+                self.image_processor.get_intensity_range(),
             )
         )
         render_window.Render()
@@ -352,16 +867,80 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
 
     ## Viewer Feature ##
     ##================##
-    def render_slice(self, image_view: ImageView, slice_data):
-        rotated_slice = np.rot90(slice_data, k=2)
+    def render_slice(self, image_view: ImageView, slice_data, scale=1, levels=None):
+        image, levels = DisplayCache.prepare(slice_data, levels)
+        self.show_display_image(image_view, image, levels, scale)
+
+        # The viewer no longer shows what its display key says
+        for plane, viewer in self.viewers.items():
+            if viewer is image_view:
+                self.rendered_keys.pop(plane, None)
 
+    def show_display_image(self, image_view: ImageView, image, levels, scale=1):
+        # Downsampled slices are scaled back to full-resolution coordinates.
+        # The view range is set by display_views, so zooming is kept.
         image_view.setImage(
-            rotated_slice.T,
-            autoRange=True,
-            autoLevels=True,
+            image,
+            autoRange=False,
+            autoLevels=False,
+            levels=levels,
             autoHistogramRange=True,
+            scale=(scale, scale),
         )
 
+    def render_plane(self, plane):
+        """Render the current slice of a plane at the resolution of its zoom."""
+        factor = self.image_processor.get_display_factor(plane)
+        key = self.image_processor.display_key(plane, factor)
+
+        # Oriented, contiguous buffers of the slices shown before are reused
+        cached = self.display_cache.get(plane, key)
+        if cached is None and self.image_processor.processing_state is not None:
+            # Processed slices are always full resolution
+            slice_data = self.process_slice(plane)
+            levels = self.processing_pipeline.levels(self.processing_pipeline.stages)
+            cached = DisplayCache.prepare(slice_data, levels)
+            self.display_cache.put(plane, key, *cached)
+        elif cached is None:
+            slice_data, factor = self.image_processor.get_display_slice(plane, factor)
+            # The levels of full-resolution slices are known from the statistics
+            levels = None
+            if factor == 1:
+                levels = self.image_processor.get_slice_range(plane)
+            cached = DisplayCache.prepare(slice_data, levels)
+            self.display_cache.put(plane, key, *cached)
+
+        image, levels = cached
+        self.show_display_image(self.viewers[plane], image, levels, factor)
+        self.rendered_factors[plane] = factor
+        self.rendered_keys[plane] = key
+
+    def render_plane_if_changed(self, plane):
+        """Render a plane only if its slice, level or processing changed."""
+        factor = self.image_processor.get_display_factor(plane)
+        if self.rendered_keys.get(plane) != self.image_processor.display_key(
+            plane, factor
+        ):
+            self.render_plane(plane)
+
+    def on_view_range_changed(self, plane):
+        """Switch to another pyramid level when a viewer is zoomed."""
+        # Nothing to do before a volume is shown, or while a 2D image is
+        if (
+            self.original_image_3d is None
+            or self.original_image_3d is not self.image_processor.image_data
+        ):
+            return
+
+        pixel_size = self.views[plane].viewPixelSize()
+        if min(pixel_size) <= 0:
+            return
+
+        self.image_processor.set_zoom(plane, min(pixel_size))
+        factor = self.image_processor.get_display_factor(plane)
+        if factor != self.rendered_factors.get(plane):
+            self.render_plane(plane)
+
     def display_views(self, image_data):
         if image_data is None:
             self.show_error_message("No image data to display.")
@@ -372,11 +951,13 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             width, height = slice_data.shape
 
             # Pass the loaded NIfTI image to the CDSS worker
-            self.cdss_worker.set_slice(slice_data)
+            self.cdss_worker.set_slice(
+                slice_data, self.image_processor.get_slice_range(plane)
+            )
             self.cdss_worker.start()
 
             # Render the slice in the viewer
-            self.render_slice(viewer, slice_data)
+            self.render_plane(plane)
 
             # Explicitly set independent ranges for each viewer
             viewer.getView().setRange(
@@ -408,8 +989,13 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
         self.cdss_worker.set_slice(image_data)
         self.cdss_worker.start()
 
-        # Render the slice in the viewer
-        self.render_slice(self.ui.sagittal_viewer, image_data)
+        # Render the slice in the viewer, in tiles if it is too big for one
+        if image_data.size > self.tiled_display_above:
+            self.ui.sagittal_viewer.clear()
+            self.tiled_display.set_image(*DisplayCache.prepare(image_data))
+        else:
+            self.tiled_display.clear()
+            self.render_slice(self.ui.sagittal_viewer, image_data)
 
         # Explicitly set independent ranges for each viewer
         self.ui.sagittal_viewer.getView().setRange(
@@ -424,15 +1010,31 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             # Example: Assuming slider range is -50 to 50
             contrast_range = 1 + value / 100.0  # Adjust as needed
 
+            if self.tiled_display.is_active:
+                # The tiles of a large image aren't shown by its ImageView
+                min_intensity, max_intensity = self.tiled_display.image_levels
+                intensity_center = (min_intensity + max_intensity) / 2
+                self.tiled_display.set_levels(
+                    (
+                        intensity_center
+                        - (intensity_center - min_intensity) * contrast_range,
+                        intensity_center
+                        + (max_intensity - intensity_center) * contrast_range,
+                    )
+                )
+
             # Adjust the contrast for all viewers
             for plane, viewer in self.viewers.items():
                 # Get the histogram of the current viewer
                 histogram = viewer.getHistogramWidget()
 
-                # Get current min and max intensity of the image
-                image_data = self.image_processor.get_slice(plane)
-                min_intensity = np.min(image_data)
-                max_intensity = np.max(image_data)
+                # Get current min and max intensity of the image, looked up
+                # in the statistics of the volume once they are computed
+                intensity_range = self.image_processor.get_slice_range(plane)
+                if intensity_range is None:
+                    image_data = self.image_processor.get_slice(plane)
+                    intensity_range = (np.min(image_data), np.max(image_data))
+                min_intensity, max_intensity = map(float, intensity_range)
 
                 # Calculate new levels based on contrast range
                 intensity_center = (min_intensity + max_intensity) / 2
@@ -449,9 +1051,8 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
                 histogram.setLevels(new_min, new_max)
 
                 # Optionally, adjust the displayed image
-                viewer.getView().setLimits(
-                    xMin=0, xMax=image_data.shape[1], yMin=0, yMax=image_data.shape[0]
-                )
+                height, width = self.image_processor.get_slice_shape(plane)
+                viewer.getView().setLimits(xMin=0, xMax=width, yMin=0, yMax=height)
         except Exception as e:
             self.show_error_message(f"Error adjusting contrast: {str(e)}")
 
@@ -473,9 +1074,13 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
                 self.crosshairs[plane] = {"h_line": h_line, "v_line": v_line}
 
             for plane, viewer in self.viewers.items():
+                # Only the last mouse move of each display frame is handled
                 viewer.scene.sigMouseMoved.connect(
-                    lambda event, p=plane: self.update_crosshairs(p, event)
+                    lambda event, p=plane: self.render_scheduler.defer(
+                        "crosshairs", lambda: self.update_crosshairs(p, event)
+                    )
                 )
+
         else:
             # Disable crosshairs and reset
             for plane, view in self.views.items():
@@ -487,7 +1092,16 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             for viewer in self.viewers.values():
                 viewer.scene.sigMouseMoved.disconnect()
 
+            # The planes go back to their axis-aligned orientation
+            if self.original_image_3d is not None:
+                self.image_processor.reset_rotations()
+                self.render_scheduler.mark_dirty(*self.viewers)
+
     def update_crosshairs(self, plane, event):
+        if any(self.image_processor.is_oblique(p) for p in self.viewers):
+            self.update_oblique_crosshairs(plane, event)
+            return
+
         try:
             # Map mouse position to viewer coordinates
             mouse_point = self.viewers[plane].getView().mapSceneToView(event)
@@ -518,28 +1132,7 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             self.image_processor.update_slice("axial", z)
 
             # Update crosshairs
-            for p, crosshair in self.crosshairs.items():
-                if p == "axial":
-                    crosshair["h_line"].setPos(
-                        self.image_processor.current_slices["coronal"]
-                    )
-                    crosshair["v_line"].setPos(
-                        self.image_processor.current_slices["sagittal"]
-                    )
-                elif p == "sagittal":
-                    crosshair["h_line"].setPos(
-                        self.image_processor.current_slices["axial"]
-                    )
-                    crosshair["v_line"].setPos(
-                        self.image_processor.current_slices["coronal"]
-                    )
-                elif p == "coronal":
-                    crosshair["h_line"].setPos(
-                        self.image_processor.current_slices["axial"]
-                    )
-                    crosshair["v_line"].setPos(
-                        self.image_processor.current_slices["sagittal"]
-                    )
+            self.update_crosshair_lines()
 
             # Update coordinate fields
             self.ui.x_value.setText(str(x))
@@ -550,15 +1143,202 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
             voxel_value = self.original_image_3d[z, y, x]
             self.ui.voxel_value.setText(str(voxel_value))
 
-            # Refresh all viewers
-            self.refresh_slices()
+            # Only the viewers whose slice changed are rendered again, the
+            # crosshair lines above are moved without touching the images
+            self.render_scheduler.mark_dirty(*self.viewers)
         except Exception as e:
             self.show_error_message(f"Error updating crosshairs: {str(e)}")
 
+    def update_oblique_crosshairs(self, plane, event):
+        """Move the center of the planes to the voxel under the mouse."""
+        try:
+            mouse_point = self.viewers[plane].getView().mapSceneToView(event)
+            point = self.image_processor.get_plane_point(
+                plane, mouse_point.y(), mouse_point.x()
+            )
+            shape = self.original_image_3d.shape
+            z, y, x = (
+                int(np.clip(np.rint(value), 0, size - 1))
+                for value, size in zip(point, shape)
+            )
+
+            self.image_processor.update_slice("axial", z)
+            self.image_processor.update_slice("coronal", y)
+            self.image_processor.update_slice("sagittal", x)
+            self.update_crosshair_lines()
+
+            self.ui.x_value.setText(str(x))
+            self.ui.y_value.setText(str(y))
+            self.ui.z_value.setText(str(z))
+            self.ui.voxel_value.setText(str(self.original_image_3d[z, y, x]))
+
+            # The oblique planes are previewed while the center moves
+            self.start_interaction()
+        except Exception as e:
+            self.show_error_message(f"Error updating crosshairs: {str(e)}")
+
+    def rotate_crosshairs(self, plane, degrees):
+        """Turn the crosshairs of a viewer, rotating the two other planes."""
+        if self.original_image_3d is None or not self.crosshairs:
+            return
+        self.image_processor.rotate(plane, degrees)
+        self.update_crosshair_lines()
+        self.start_interaction()
+
+    def update_crosshair_lines(self):
+        # The horizontal and vertical lines of each viewer are the other planes
+        line_planes = {
+            "axial": {"h_line": "coronal", "v_line": "sagittal"},
+            "sagittal": {"h_line": "axial", "v_line": "coronal"},
+            "coronal": {"h_line": "axial", "v_line": "sagittal"},
+        }
+        center = dict(
+            zip(["axial", "coronal", "sagittal"], self.image_processor.get_center())
+        )
+        for plane, crosshair in self.crosshairs.items():
+            # The center is at the same pixel as in the axis-aligned slice
+            if plane == "axial":
+                position = (center["sagittal"], center["coronal"])
+            elif plane == "sagittal":
+                position = (center["coronal"], center["axial"])
+            else:
+                position = (center["sagittal"], center["axial"])
+
+            for line_name, other_plane in line_planes[plane].items():
+                line = crosshair[line_name]
+                line.setAngle(
+                    self.image_processor.get_crosshair_angle(plane, other_plane)
+                )
+                line.setPos(position)
+
+    def start_interaction(self):
+        self.image_processor.interacting = True
+        self.interaction_timer.start()
+        self.render_scheduler.mark_dirty(*self.viewers)
+
+    def end_interaction(self):
+        self.image_processor.interacting = False
+        self.render_scheduler.mark_dirty(*self.viewers)
+
+    ## Slice Navigation ##
+    ##==================##
+    def step_slice(self, plane, step):
+        # Only volumes are stepped through, not a 2D image
+        if (
+            self.original_image_3d is None
+            or self.original_image_3d is not self.image_processor.image_data
+        ):
+            return
+
+        slice_count = self.image_processor.get_slice_count(plane)
+        index = self.image_processor.current_slices[plane] + step
+        index = max(0, min(index, slice_count - 1))
+        if index == self.image_processor.current_slices[plane]:
+            return
+
+        self.image_processor.update_slice(plane, index)
+        if self.crosshairs:
+            self.update_crosshair_lines()
+        # Rendered once per frame, along with the oblique planes it crosses
+        self.render_scheduler.mark_dirty(*self.viewers)
+        self.prefetch_slices(plane, step)
+
+    def prefetch_slices(self, plane, step):
+        """Prepare the next slices in the direction a viewer is scrolled."""
+        image_processor = self.image_processor
+        # Processed slices are only computed for the slices shown
+        if image_processor.processing_state is not None:
+            return
+
+        factor = image_processor.get_display_factor(plane)
+        frame_source = image_processor.get_frame_source(plane, factor)
+        if frame_source is None:
+            return
+
+        self.slice_prefetcher.scrolled(
+            plane,
+            image_processor.current_slices[plane],
+            step,
+            image_processor.get_slice_count(plane),
+            frame_source,
+            lambda index: image_processor.display_key(plane, factor, index),
+        )
+
+    ## Cine ##
+    ##======##
+    def toggle_cine(self, checked):
+        if not checked:
+            self.cine_player.stop()
+            self.ui.statusbar.clearMessage()
+            return
+
+        # Only volumes are played, not a 2D image
+        if (
+            self.original_image_3d is None
+            or self.original_image_3d is not self.image_processor.image_data
+        ):
+            self.ui.cine_button.setChecked(False)
+            return
+        self.start_cine()
+
+    def start_cine(self):
+        plane = self.ui.cine_plane_combo_box.currentText().lower()
+        slice_count = self.image_processor.get_slice_count(plane)
+        first_index = self.image_processor.current_slices[plane]
+
+        # Oblique planes are sampled on the fly, without prefetching
+        frame_source = self.image_processor.get_frame_source(plane)
+        prefetcher = None
+        if frame_source is not None:
+            # Frames are shown, and cached, as the processed slices
+            if self.image_processor.processing_state is not None:
+                frame_source = self.process_frames(plane, frame_source)
+            prefetcher = CinePrefetcher(frame_source, slice_count, first_index)
+
+        self.cine_player.start(
+            plane,
+            slice_count,
+            first_index,
+            self.ui.cine_fps_spinbox.value(),
+            prefetcher,
+        )
+
+    def restart_cine(self):
+        # Another plane, frame rate or projection is played from where it is
+        if self.cine_player.is_playing:
+            self.start_cine()
+
+    def show_cine_frame(self, plane, index, frame):
+        self.image_processor.update_slice(plane, index)
+
+        if frame is None:
+            self.render_plane(plane)
+        else:
+            # Prefetched frames are full-resolution display buffers
+            key = self.image_processor.display_key(plane, 1)
+            self.display_cache.put(plane, key, *frame)
+            self.show_display_image(self.viewers[plane], *frame)
+            self.rendered_factors[plane] = 1
+            self.rendered_keys[plane] = key
+
+        if self.crosshairs:
+            self.update_crosshair_lines()
+        # Oblique planes go through the played slice
+        self.render_scheduler.mark_dirty(*(p for p in self.viewers if p != plane))
+
+    def cine_failed(self, message):
+        self.ui.cine_button.setChecked(False)
+        self.show_error_message(f"Cine playback stopped: {message}")
+
+    def show_cine_stats(self, fps, dropped_frames, hit_rate):
+        self.ui.statusbar.showMessage(
+            f"Cine: {fps:.1f}/{self.ui.cine_fps_spinbox.value()} fps | "
+            f"{dropped_frames} dropped frames | {hit_rate:.0%} prefetched"
+        )
+
     def refresh_slices(self):
         for plane in self.viewers.keys():
-            slice_data = self.image_processor.get_slice(plane)
-            self.render_slice(self.viewers[plane], slice_data)
+            self.render_plane(plane)
 
     def update_location_display(self, x, y, z):
         try:
@@ -662,12 +1442,34 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
         )
         return file_path
 
-    def set_initial_slices(self, image_data):
-        self.image_processor.set_image_data(image_data=image_data)
+    def set_initial_slices(self, image_data, pyramid_levels=None, statistics=None):
+        # The slices of the previous volume won't be shown again
+        self.ui.cine_button.setChecked(False)
+        self.cancel_volume_filtering()
+        self.unfiltered_image_3d = None
+        self.display_cache.clear()
+        self.clear_processing()
+        self.tiled_display.clear()
+        self.image_processor.set_image_data(
+            image_data=image_data,
+            pyramid_levels=pyramid_levels,
+            statistics=statistics,
+            spacing=self.original_spacing_info,
+        )
 
     def append_image_to_history(self, image_path, image_format):
         self.file_history_manager.add_to_history(image_path, image_format)
 
+    def show_load_progress(self, done, total):
+        self.ui.statusbar.showMessage(f"Loading slices: {done}/{total}")
+        QApplication.processEvents()
+
+    def show_load_issues(self, issues):
+        if issues:
+            self.ui.statusbar.showMessage(" | ".join(issues))
+        else:
+            self.ui.statusbar.clearMessage()
+
     def show_error_message(self, message):
         msg = QMessageBox()
         msg.setWindowTitle("Error")
@@ -676,6 +1478,14 @@ class DicomViewerBackend(QMainWindow, MainWindowUI):
         msg.exec_()
 
     def closeEvent(self, event):
+        self.stop_series_loading()
+        self.cancel_volume_filtering()
+        self.cine_player.stop()
+        self.slice_prefetcher.stop()
+        self.tiled_display.shutdown()
+        self.filter_preview.shutdown()
+        for worker in self.findChildren(VolumeCompressionWorker):
+            worker.wait()
         for viewer in [
             self.ui.axial_viewer,
             self.ui.sagittal_viewer,
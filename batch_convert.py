@@ -0,0 +1,237 @@
+"""
+Decode studies into the viewer's cache ahead of time, without Qt.
+
+Every study (a DICOM series folder or a volume file) is loaded through
+ImageLoader on a process pool, and its decoded volume, pyramid levels and
+intensity statistics are written to the decoded-volume cache, so the viewer
+memory-maps them instead of decoding the study when it is opened.
+
+The outcome of every study is kept in a JSON manifest. Running the same
+command again skips the studies that are already done (unless they changed
+since), so an interrupted run picks up where it stopped.
+
+    python batch_convert.py /data/incoming --workers 8
+    python batch_convert.py --list studies.txt
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.dicom_series_loader import read_dicom_header
+from core.image_loader import ImageLoader
+from core.volume_cache import DEFAULT_CACHE_DIR, DEFAULT_SIZE_BUDGET, VolumeCache
+from core.volume_pyramid import VolumePyramid
+from core.volume_statistics import VolumeStatistics
+
+DEFAULT_MANIFEST_PATH = os.path.join(
+    os.path.expanduser("~"), ".dicom_viewer", "batch_manifest.json"
+)
+VOLUME_EXTENSIONS = (".nii", ".nii.gz", ".mhd", ".nrrd")
+# Files next to DICOM slices that are never slices themselves
+IGNORED_EXTENSIONS = (".raw", ".zraw", ".txt", ".json", ".xml", ".png", ".jpg")
+
+
+def find_studies(paths):
+    """
+    The studies under the given paths, as (path, image type) pairs.
+
+    A volume file is a study, and so is every folder that holds DICOM files.
+    """
+    studies = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            if path.lower().endswith(VOLUME_EXTENSIONS):
+                studies.append((path, None))
+            elif read_dicom_header(path) is not None:
+                studies.append((os.path.dirname(path), "series"))
+            continue
+
+        for directory, subdirectories, file_names in os.walk(path):
+            subdirectories.sort()
+            candidates = []
+            for name in sorted(file_names):
+                file_path = os.path.join(directory, name)
+                if name.lower().endswith(VOLUME_EXTENSIONS):
+                    studies.append((file_path, None))
+                elif not name.startswith(".") and not name.lower().endswith(
+                    IGNORED_EXTENSIONS
+                ):
+                    candidates.append(file_path)
+
+            # A folder is a series if its first readable file is DICOM
+            if any(read_dicom_header(f) is not None for f in candidates[:5]):
+                studies.append((directory, "series"))
+
+    # The same study can be reached through several inputs
+    return list(dict.fromkeys(studies))
+
+
+def convert_study(path, image_type, cache_dir, size_budget):
+    """Decode one study and write its cache entry. Runs in a worker process."""
+    start_time = time.perf_counter()
+
+    if image_type == "series":
+        volume, spacing = ImageLoader.load_dicom_series(path)
+    else:
+        volume, spacing = ImageLoader.load_image(path)
+
+    pyramid = VolumePyramid(volume)
+    pyramid.build()
+    statistics = VolumeStatistics.compute(volume)
+
+    # The main process enforces the size budget once all workers are done,
+    # rather than several workers evicting the same entries at once
+    cache = VolumeCache(cache_dir, size_budget)
+    cache.store(
+        path,
+        volume,
+        spacing,
+        pyramid_levels={f: level for f, level in pyramid.levels.items() if f > 1},
+        statistics=statistics,
+        evict=False,
+    )
+
+    return {
+        "status": "done",
+        "shape": list(volume.shape),
+        "seconds": round(time.perf_counter() - start_time, 2),
+    }
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path, manifest):
+    # Written to a temporary file first, so an interrupted write can't
+    # corrupt the manifest of the studies done so far
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+def is_pending(entry, key, cache, path, retry_failed):
+    if entry is None or entry.get("key") != key:
+        return True
+    if entry["status"] == "done":
+        # The entry may have been evicted since
+        return not cache.contains(path)
+    return retry_failed
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Decode studies into the DICOM viewer's cache ahead of time."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="study folders, DICOM series folders or volume files",
+    )
+    parser.add_argument(
+        "--list", help="text file with one study path per line", dest="list_file"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="number of worker processes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="decoded-volume cache of the viewer (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=DEFAULT_SIZE_BUDGET / 1024**3,
+        help="size budget of the cache in GB (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=DEFAULT_MANIFEST_PATH,
+        help="progress manifest of the run (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="convert the studies that failed in a previous run again",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    paths = list(args.paths)
+    if args.list_file:
+        with open(args.list_file) as f:
+            paths += [line.strip() for line in f if line.strip()]
+    if not paths:
+        print("No studies given", file=sys.stderr)
+        return 2
+
+    size_budget = int(args.cache_size * 1024**3)
+    cache = VolumeCache(args.cache_dir, size_budget)
+    manifest = load_manifest(args.manifest)
+
+    pending = []
+    for path, image_type in find_studies(paths):
+        key = VolumeCache.key(path)
+        if is_pending(manifest.get(path), key, cache, path, args.retry_failed):
+            pending.append((path, image_type, key))
+
+    print(f"{len(pending)} studies to convert, {args.workers} worker processes")
+    failed = 0
+
+    # Spawned workers don't inherit the state (threads, locks) of this process
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(
+                convert_study, path, image_type, args.cache_dir, size_budget
+            ): (path, image_type, key)
+            for path, image_type, key in pending
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                path, image_type, key = futures[future]
+                try:
+                    entry = future.result()
+                    message = f"done in {entry['seconds']} s"
+                except Exception as e:
+                    entry = {"status": "failed", "error": str(e)}
+                    message = f"failed: {e}"
+                    failed += 1
+
+                entry.update(key=key, type=image_type)
+                manifest[path] = entry
+                save_manifest(args.manifest, manifest)
+                print(f"[{done}/{len(pending)}] {path}: {message}")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("Interrupted, run the same command again to resume")
+            return 130
+        finally:
+            cache.evict()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,23 +18,26 @@ class CDSSWorker(QThread):
             "vishnu027/dental_classification_model_010424_2"
         )
         self.slice_data = None  # Placeholder for the 2D slice
+        self.intensity_range = None  # (min, max) of the slice, if known
 
-    def set_slice(self, slice_data):
-        """Set the 2D slice data for processing."""
+    def set_slice(self, slice_data, intensity_range=None):
+        """Set the 2D slice data (and its (min, max), if known) for processing."""
         self.slice_data = slice_data
+        self.intensity_range = intensity_range
 
-    def preprocess_slice(self, slice_data):
+    def preprocess_slice(self, slice_data, intensity_range=None):
         """
         Preprocess the 2D slice for the Hugging Face model.
         Normalizes the image and converts it to a format suitable for the processor.
         """
         IMG_SIZE = (224, 224)  # Resize for model input consistency
 
-        # Normalize the slice to [0, 255] range
-        normalized_slice = (slice_data - np.min(slice_data)) / (
-            np.max(slice_data) - np.min(slice_data)
-        )
-        normalized_slice = (normalized_slice * 255).astype(np.uint8)
+        # Normalize the slice to [0, 255] range, in float32
+        min_val, max_val = intensity_range or (np.min(slice_data), np.max(slice_data))
+        min_val, max_val = float(min_val), float(max_val)
+        normalized_slice = np.subtract(slice_data, min_val, dtype=np.float32)
+        normalized_slice *= 255.0 / ((max_val - min_val) or 1.0)
+        normalized_slice = normalized_slice.astype(np.uint8)
 
         # Convert to RGB using PIL
         img = Image.fromarray(normalized_slice).convert("RGB")
@@ -51,7 +54,7 @@ class CDSSWorker(QThread):
         if self.slice_data is not None:
             try:
                 # Preprocess the 2D slice
-                inputs = self.preprocess_slice(self.slice_data)
+                inputs = self.preprocess_slice(self.slice_data, self.intensity_range)
 
                 # Perform inference
                 with torch.no_grad():
@@ -0,0 +1,156 @@
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+import numpy as np
+
+
+class ChunkedVolume:
+    """
+    Array-like volume kept as zlib-compressed chunks.
+
+    Only a bounded LRU of decompressed chunks is held in memory, so large
+    volumes (or several of them) take roughly their compressed size. It can
+    be indexed like a NumPy array along any of the three axes, which is all
+    ImageProcessor.get_slice needs, and np.asarray() gives the dense volume.
+    """
+
+    def __init__(
+        self,
+        volume,
+        chunk_shape=(32, 32, 32),
+        cache_bytes=256 * 1024**2,
+        compression_level=1,
+        max_workers=4,
+    ):
+        self.shape = tuple(volume.shape)
+        self.dtype = np.dtype(volume.dtype)
+        self.chunk_shape = chunk_shape
+        self.compression_level = compression_level
+        self.grid_shape = tuple(
+            -(-size // chunk) for size, chunk in zip(self.shape, chunk_shape)
+        )
+
+        chunk_nbytes = int(np.prod(chunk_shape)) * self.dtype.itemsize
+        self.cache_size = max(1, cache_bytes // chunk_nbytes)
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+        # zlib releases the GIL, so chunks are (de)compressed in parallel
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        grid = list(product(*(range(n) for n in self.grid_shape)))
+        self.chunks = dict(
+            zip(
+                grid,
+                self.executor.map(lambda c: self._compress(volume, c), grid),
+            )
+        )
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    @property
+    def compressed_nbytes(self):
+        return sum(len(chunk) for chunk in self.chunks.values())
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self[:, :, :]
+        if dtype is not None:
+            array = array.astype(dtype, copy=False)
+        return array
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (3 - len(key) + 1) + key[i + 1 :]
+        key = key + (slice(None),) * (3 - len(key))
+
+        # Read the bounding box of the request, then apply steps and integers
+        bounds, post_key = [], []
+        for index, size in zip(key, self.shape):
+            if isinstance(index, slice):
+                start, stop, step = index.indices(size)
+                if step < 0:
+                    start, stop = stop + 1, start + 1
+                bounds.append((start, max(start, stop)))
+                post_key.append(slice(None, None, step))
+            else:
+                index = int(index)
+                if index < 0:
+                    index += size
+                if not 0 <= index < size:
+                    raise IndexError(f"index {index} is out of bounds")
+                bounds.append((index, index + 1))
+                post_key.append(0)
+
+        return self._read_box(bounds)[tuple(post_key)]
+
+    def _read_box(self, bounds):
+        out = np.empty([stop - start for start, stop in bounds], dtype=self.dtype)
+        if out.size == 0:
+            return out
+
+        chunk_ranges = [
+            range(start // chunk, (stop - 1) // chunk + 1)
+            for (start, stop), chunk in zip(bounds, self.chunk_shape)
+        ]
+        chunk_indices = list(product(*chunk_ranges))
+
+        for chunk_index, chunk in zip(chunk_indices, self._get_chunks(chunk_indices)):
+            source, target = [], []
+            for axis, (start, stop) in enumerate(bounds):
+                chunk_start = chunk_index[axis] * self.chunk_shape[axis]
+                low = max(start, chunk_start)
+                high = min(stop, chunk_start + chunk.shape[axis])
+                source.append(slice(low - chunk_start, high - chunk_start))
+                target.append(slice(low - start, high - start))
+            out[tuple(target)] = chunk[tuple(source)]
+
+        return out
+
+    def _get_chunks(self, chunk_indices):
+        with self.lock:
+            cached = {c: self.cache.get(c) for c in chunk_indices}
+            for c, chunk in cached.items():
+                if chunk is not None:
+                    self.cache.move_to_end(c)
+
+        missing = [c for c, chunk in cached.items() if chunk is None]
+        for c, chunk in zip(missing, self.executor.map(self._decompress, missing)):
+            cached[c] = chunk
+
+        with self.lock:
+            for c in missing:
+                self.cache[c] = cached[c]
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return [cached[c] for c in chunk_indices]
+
+    def _chunk_box(self, chunk_index):
+        return tuple(
+            slice(i * chunk, min((i + 1) * chunk, size))
+            for i, chunk, size in zip(chunk_index, self.chunk_shape, self.shape)
+        )
+
+    def _compress(self, volume, chunk_index):
+        data = np.ascontiguousarray(volume[self._chunk_box(chunk_index)])
+        return zlib.compress(data.tobytes(), self.compression_level)
+
+    def _decompress(self, chunk_index):
+        shape = [box.stop - box.start for box in self._chunk_box(chunk_index)]
+        data = zlib.decompress(self.chunks[chunk_index])
+        return np.frombuffer(data, dtype=self.dtype).reshape(shape)
@@ -0,0 +1,104 @@
+import threading
+from collections import deque
+
+from core.display_cache import DisplayCache
+
+
+class CinePrefetcher:
+    """
+    Prepares the upcoming frames of a cine loop in a background thread.
+
+    Frames are numbered from the start of the playback, and frame f shows
+    slice (first_index + f) % slice_count, looping over the plane. The
+    thread reads and prepares them (DisplayCache.prepare) in order into a
+    ring buffer of capacity frames, and waits while it is full. Frames that
+    playback skipped are dropped, and when it gets ahead of the thread, the
+    thread jumps to the frames after it.
+
+    frame_source(index) returns a slice and its levels (or None), it is only
+    called from the thread. If it raises, the thread stops and keeps the
+    exception in error, for playback to stop once it runs out of frames.
+    """
+
+    def __init__(self, frame_source, slice_count, first_index, capacity=16):
+        self.frame_source = frame_source
+        self.slice_count = slice_count
+        self.first_index = first_index
+        self.capacity = capacity
+
+        self.frames = deque()
+        self.next_frame = 0
+        # Frames before it were shown or skipped already
+        self.first_wanted = 0
+        self.hits = 0
+        self.misses = 0
+        self.stopped = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def index(self, frame_number):
+        return (self.first_index + frame_number) % self.slice_count
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.frames.clear()
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and len(self.frames) >= self.capacity:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                frame_number = self.next_frame
+                self.next_frame += 1
+
+            try:
+                slice_data, levels = self.frame_source(self.index(frame_number))
+                frame = DisplayCache.prepare(slice_data, levels)
+            except Exception as e:
+                # The frames prepared before it can still be taken
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                return
+
+            with self.condition:
+                # Playback may have gone past it in the meantime
+                if frame_number >= self.first_wanted:
+                    self.frames.append((frame_number, frame))
+                self.condition.notify_all()
+
+    def take(self, frame_number):
+        """
+        The prepared (image, levels) of a frame, or None if it isn't ready,
+        in which case playback prepares it itself.
+        """
+        with self.condition:
+            self.first_wanted = frame_number + 1
+            while self.frames and self.frames[0][0] < frame_number:
+                self.frames.popleft()
+
+            if self.frames and self.frames[0][0] == frame_number:
+                self.hits += 1
+                frame = self.frames.popleft()[1]
+            else:
+                self.misses += 1
+                frame = None
+                # Frames up to this one are too late already
+                self.next_frame = max(self.next_frame, frame_number + 1)
+
+            self.condition.notify_all()
+            return frame
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.0
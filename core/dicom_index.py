@@ -0,0 +1,313 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from core.dicom_series_loader import (
+    IMAGE_ORIENTATION_TAG,
+    IMAGE_POSITION_TAG,
+    INSTANCE_NUMBER_TAG,
+    MODALITY_TAG,
+    PATIENT_ID_TAG,
+    PATIENT_NAME_TAG,
+    RESCALE_INTERCEPT_TAG,
+    RESCALE_SLOPE_TAG,
+    SERIES_DESCRIPTION_TAG,
+    SERIES_UID_TAG,
+    SOP_INSTANCE_UID_TAG,
+    STUDY_DATE_TAG,
+    STUDY_DESCRIPTION_TAG,
+    STUDY_UID_TAG,
+    read_dicom_header,
+)
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.expanduser("~"), ".dicom_viewer", "dicom_index.sqlite"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    patient_name TEXT
+);
+CREATE TABLE IF NOT EXISTS studies (
+    study_uid TEXT PRIMARY KEY,
+    patient_id TEXT,
+    study_date TEXT,
+    study_description TEXT
+);
+CREATE TABLE IF NOT EXISTS series (
+    series_uid TEXT PRIMARY KEY,
+    study_uid TEXT,
+    modality TEXT,
+    series_description TEXT
+);
+CREATE TABLE IF NOT EXISTS instances (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER,
+    series_uid TEXT,
+    sop_uid TEXT,
+    instance_number TEXT,
+    image_position TEXT,
+    image_orientation TEXT,
+    rows INTEGER,
+    columns INTEGER,
+    spacing_x REAL,
+    spacing_y REAL,
+    dtype TEXT,
+    rescale_slope TEXT,
+    rescale_intercept TEXT,
+    stored_dtype TEXT
+);
+CREATE INDEX IF NOT EXISTS instances_series ON instances (series_uid);
+"""
+
+# Columns added to the instances table after its first version
+ADDED_COLUMNS = {
+    "rescale_slope": "TEXT",
+    "rescale_intercept": "TEXT",
+    "stored_dtype": "TEXT",
+}
+
+
+class DicomIndex:
+    """
+    SQLite index of the DICOM files under one or more root folders.
+
+    Only the headers are read, on a thread pool, and only for the files that
+    are new or whose modification time changed since the last update. Files
+    that aren't DICOM are recorded too (with no series) so they aren't read
+    again. A series can then be loaded from its indexed headers, without
+    listing or reading its directory again.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH, max_workers=None):
+        self.db_path = db_path
+        self.max_workers = max_workers or min(16, (os.cpu_count() or 1) * 2)
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+            self._add_missing_columns(connection)
+
+    @contextmanager
+    def connect(self):
+        """
+        A connection for one transaction, committed (or rolled back on an
+        error) and closed at the end. One connection per call, so the index
+        can be used from any thread.
+        """
+        connection = sqlite3.connect(self.db_path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def update(self, root, progress_callback=None):
+        """
+        Bring the index of a root folder up to date.
+
+        progress_callback(done, total) is called while the changed files are
+        read. Returns the number of (added or changed, removed) files.
+        """
+        root = os.path.abspath(root)
+        files_on_disk = {}
+        for directory, _, file_names in os.walk(root):
+            for name in file_names:
+                path = os.path.join(directory, name)
+                try:
+                    files_on_disk[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+
+        prefix = os.path.join(root, "")
+        with self.connect() as connection:
+            indexed_files = dict(
+                connection.execute(
+                    "SELECT path, mtime FROM instances WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+            )
+
+        changed_files = [
+            path
+            for path, mtime in files_on_disk.items()
+            if indexed_files.get(path) != mtime
+        ]
+        removed_files = [path for path in indexed_files if path not in files_on_disk]
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as executor, self.connect() as connection:
+            headers = executor.map(read_dicom_header, changed_files)
+            for done, (path, header) in enumerate(zip(changed_files, headers), start=1):
+                self._insert(connection, path, files_on_disk[path], header)
+                if progress_callback:
+                    progress_callback(done, len(changed_files))
+
+            connection.executemany(
+                "DELETE FROM instances WHERE path = ?",
+                [(path,) for path in removed_files],
+            )
+            self._remove_orphans(connection)
+
+        return len(changed_files), len(removed_files)
+
+    def series(self):
+        """
+        All the indexed series, with their study and patient.
+
+        Returns a list of dicts sorted by patient, study date and series.
+        """
+        query = """
+            SELECT patients.patient_id, patients.patient_name,
+                   studies.study_uid, studies.study_date, studies.study_description,
+                   series.series_uid, series.modality, series.series_description,
+                   COUNT(instances.path)
+            FROM series
+            JOIN instances ON instances.series_uid = series.series_uid
+            LEFT JOIN studies ON studies.study_uid = series.study_uid
+            LEFT JOIN patients ON patients.patient_id = studies.patient_id
+            GROUP BY series.series_uid
+            ORDER BY patients.patient_name, studies.study_date,
+                     series.series_description
+        """
+        keys = [
+            "patient_id",
+            "patient_name",
+            "study_uid",
+            "study_date",
+            "study_description",
+            "series_uid",
+            "modality",
+            "series_description",
+            "instances",
+        ]
+        with self.connect() as connection:
+            return [dict(zip(keys, row)) for row in connection.execute(query)]
+
+    def series_headers(self, series_uid):
+        """
+        The indexed headers of a series, in the format of read_dicom_header.
+        """
+        query = """
+            SELECT path, instance_number, image_position, image_orientation,
+                   rows, columns, spacing_x, spacing_y, dtype,
+                   rescale_slope, rescale_intercept, stored_dtype
+            FROM instances WHERE series_uid = ?
+        """
+        with self.connect() as connection:
+            rows = connection.execute(query, (series_uid,)).fetchall()
+
+        return [
+            {
+                "file": path,
+                SERIES_UID_TAG: series_uid,
+                INSTANCE_NUMBER_TAG: instance_number,
+                IMAGE_POSITION_TAG: image_position,
+                IMAGE_ORIENTATION_TAG: image_orientation,
+                "shape": (rows, columns),
+                "spacing": (spacing_x, spacing_y),
+                "dtype": np.dtype(dtype),
+                RESCALE_SLOPE_TAG: rescale_slope,
+                RESCALE_INTERCEPT_TAG: rescale_intercept,
+                "stored_dtype": np.dtype(stored_dtype) if stored_dtype else None,
+            }
+            for (
+                path,
+                instance_number,
+                image_position,
+                image_orientation,
+                rows,
+                columns,
+                spacing_x,
+                spacing_y,
+                dtype,
+                rescale_slope,
+                rescale_intercept,
+                stored_dtype,
+            ) in rows
+        ]
+
+    @staticmethod
+    def _insert(connection, path, mtime, header):
+        if header is None:
+            # Not DICOM, only remember its mtime so it isn't read again
+            connection.execute(
+                "INSERT OR REPLACE INTO instances (path, mtime) VALUES (?, ?)",
+                (path, mtime),
+            )
+            return
+
+        connection.execute(
+            "INSERT OR REPLACE INTO patients VALUES (?, ?)",
+            (header[PATIENT_ID_TAG], header[PATIENT_NAME_TAG]),
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO studies VALUES (?, ?, ?, ?)",
+            (
+                header[STUDY_UID_TAG],
+                header[PATIENT_ID_TAG],
+                header[STUDY_DATE_TAG],
+                header[STUDY_DESCRIPTION_TAG],
+            ),
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?)",
+            (
+                header[SERIES_UID_TAG],
+                header[STUDY_UID_TAG],
+                header[MODALITY_TAG],
+                header[SERIES_DESCRIPTION_TAG],
+            ),
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO instances VALUES "
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                mtime,
+                header[SERIES_UID_TAG],
+                header[SOP_INSTANCE_UID_TAG],
+                header[INSTANCE_NUMBER_TAG],
+                header[IMAGE_POSITION_TAG],
+                header[IMAGE_ORIENTATION_TAG],
+                header["shape"][0],
+                header["shape"][1],
+                header["spacing"][0],
+                header["spacing"][1],
+                str(header["dtype"]),
+                header[RESCALE_SLOPE_TAG],
+                header[RESCALE_INTERCEPT_TAG],
+                str(header["stored_dtype"]) if header["stored_dtype"] else None,
+            ),
+        )
+
+    @staticmethod
+    def _add_missing_columns(connection):
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(instances)")}
+        missing = [name for name in ADDED_COLUMNS if name not in columns]
+        for name in missing:
+            connection.execute(
+                f"ALTER TABLE instances ADD COLUMN {name} {ADDED_COLUMNS[name]}"
+            )
+        if missing:
+            # The files indexed before have to be read again on the next update
+            connection.execute("UPDATE instances SET mtime = NULL")
+
+    @staticmethod
+    def _remove_orphans(connection):
+        connection.execute(
+            "DELETE FROM series WHERE series_uid NOT IN "
+            "(SELECT series_uid FROM instances WHERE series_uid IS NOT NULL)"
+        )
+        connection.execute(
+            "DELETE FROM studies WHERE study_uid NOT IN (SELECT study_uid FROM series)"
+        )
+        connection.execute(
+            "DELETE FROM patients WHERE patient_id NOT IN "
+            "(SELECT patient_id FROM studies)"
+        )
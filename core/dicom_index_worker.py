@@ -0,0 +1,23 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class DicomIndexWorker(QThread):
+    """Update a DicomIndex for a root folder in the background."""
+
+    progress_signal = pyqtSignal(int, int)  # Headers read so far, total
+    finished_signal = pyqtSignal(int, int)  # Added or changed files, removed files
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, dicom_index, root):
+        super().__init__()
+        self.dicom_index = dicom_index
+        self.root = root
+
+    def run(self):
+        try:
+            changed, removed = self.dicom_index.update(
+                self.root, progress_callback=self.progress_signal.emit
+            )
+            self.finished_signal.emit(changed, removed)
+        except Exception as e:
+            self.error_signal.emit(f"Failed to index DICOM folder: {e}")
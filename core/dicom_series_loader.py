@@ -0,0 +1,345 @@
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import SimpleITK as sitk
+
+from core.lazy_volume import LazyVolume
+
+# DICOM tags read from the headers (SimpleITK metadata keys)
+PATIENT_ID_TAG = "0010|0020"
+PATIENT_NAME_TAG = "0010|0010"
+STUDY_UID_TAG = "0020|000d"
+STUDY_DATE_TAG = "0008|0020"
+STUDY_DESCRIPTION_TAG = "0008|1030"
+SERIES_UID_TAG = "0020|000e"
+SERIES_DESCRIPTION_TAG = "0008|103e"
+MODALITY_TAG = "0008|0060"
+SOP_INSTANCE_UID_TAG = "0008|0018"
+INSTANCE_NUMBER_TAG = "0020|0013"
+IMAGE_POSITION_TAG = "0020|0032"
+IMAGE_ORIENTATION_TAG = "0020|0037"
+BITS_ALLOCATED_TAG = "0028|0100"
+PIXEL_REPRESENTATION_TAG = "0028|0103"
+RESCALE_INTERCEPT_TAG = "0028|1052"
+RESCALE_SLOPE_TAG = "0028|1053"
+
+HEADER_TAGS = [
+    PATIENT_ID_TAG,
+    PATIENT_NAME_TAG,
+    STUDY_UID_TAG,
+    STUDY_DATE_TAG,
+    STUDY_DESCRIPTION_TAG,
+    SERIES_UID_TAG,
+    SERIES_DESCRIPTION_TAG,
+    MODALITY_TAG,
+    SOP_INSTANCE_UID_TAG,
+    INSTANCE_NUMBER_TAG,
+    IMAGE_POSITION_TAG,
+    IMAGE_ORIENTATION_TAG,
+    BITS_ALLOCATED_TAG,
+    PIXEL_REPRESENTATION_TAG,
+    RESCALE_INTERCEPT_TAG,
+    RESCALE_SLOPE_TAG,
+]
+
+
+class DicomSeriesLoader:
+    """
+    Single-pass DICOM series loader.
+
+    The series is sorted from the headers only (ImagePositionPatient along
+    the slice normal), then the pixel data of every file is decoded once on
+    a thread pool straight into one preallocated volume.
+
+    The volume keeps the stored pixel values (e.g. int16 for CT) when the
+    whole series shares one rescale slope and intercept, and the rescale is
+    applied lazily to the slices that are read (see rescaled_volume).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.files = []
+        self.positions = []
+        self.spacing = None
+        self.slice_shape = None
+        self.dtype = None
+        self.slope = 1.0
+        self.intercept = 0.0
+        self.volume = None
+        # (min, max) of the stored values of each decoded slice
+        self.slice_ranges = []
+        self.issues = []
+
+    def load(self, path, progress_callback=None):
+        """
+        Read a series from a directory (or from the directory of a .dcm file).
+
+        Returns the volume and its (x, y, z) spacing like sitk would.
+        """
+        self.scan(path)
+        self.allocate()
+        self.decode(progress_callback=progress_callback)
+        return self.rescaled_volume(), self.spacing
+
+    def scan(self, path=None, files=None, headers=None):
+        """
+        Read the headers of the series and sort its slices.
+
+        Either a directory/file path, an explicit list of files or headers
+        that were already read (from a DicomIndex) can be given. When they
+        hold several series, the biggest one (or the one of the given .dcm
+        file) is selected.
+        """
+        self.issues = []
+        selected_uid = None
+
+        if headers is None and files is None:
+            if os.path.isfile(path):
+                selected_uid = read_dicom_header(path)[SERIES_UID_TAG]
+                path = os.path.dirname(path)
+            files = [
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if os.path.isfile(os.path.join(path, name))
+            ]
+
+        if headers is None:
+            headers = self._read_headers(files)
+        if not headers:
+            raise ValueError("No DICOM files found")
+
+        # Keep a single series
+        if selected_uid is None:
+            series_counts = Counter(h[SERIES_UID_TAG] for h in headers)
+            selected_uid = series_counts.most_common(1)[0][0]
+            if len(series_counts) > 1:
+                self.issues.append(
+                    f"{len(series_counts)} series found, "
+                    f"loading the one with {series_counts[selected_uid]} slices"
+                )
+        headers = [h for h in headers if h[SERIES_UID_TAG] == selected_uid]
+
+        # All the slices must have the same in-plane geometry
+        slice_shapes = Counter(h["shape"] for h in headers)
+        self.slice_shape = slice_shapes.most_common(1)[0][0]
+        if len(slice_shapes) > 1:
+            headers = [h for h in headers if h["shape"] == self.slice_shape]
+            self.issues.append("Skipped slices with a different matrix size")
+
+        self._sort_headers(headers)
+
+        self.files = [h["file"] for h in headers]
+        self._select_dtype(headers)
+        self.spacing = (
+            headers[0]["spacing"][0],
+            headers[0]["spacing"][1],
+            self._check_slice_spacing(),
+        )
+
+        return self.files
+
+    @property
+    def is_rescaled(self):
+        return self.slope != 1.0 or self.intercept != 0.0
+
+    @property
+    def stored_range(self):
+        """The (min, max) of the stored values, once every slice is decoded."""
+        if not self.slice_ranges or None in self.slice_ranges:
+            return None
+        return (
+            min(low for low, _ in self.slice_ranges),
+            max(high for _, high in self.slice_ranges),
+        )
+
+    def rescaled_volume(self):
+        """
+        The volume with the rescale of the series applied as it is read, in
+        the smallest dtype its values fit in once they are all decoded.
+        """
+        if not self.is_rescaled:
+            return self.volume
+        return LazyVolume(self.volume, self.slope, self.intercept, self.stored_range)
+
+    def allocate(self):
+        """Allocate the volume that the slices are decoded into."""
+        self.volume = np.zeros((len(self.files),) + self.slice_shape, dtype=self.dtype)
+        self.slice_ranges = [None] * len(self.files)
+        return self.volume
+
+    def decode_slice(self, index):
+        """Decode one file into its place in the preallocated volume."""
+        reader = sitk.ImageFileReader()
+        reader.SetImageIO("GDCMImageIO")
+        reader.SetFileName(self.files[index])
+        image = reader.Execute()
+
+        # A view on the decoded buffer, so the only copy is into the volume
+        pixels = sitk.GetArrayViewFromImage(image).reshape(self.slice_shape)
+        if self.is_rescaled:
+            # GDCM always applies the rescale, undo it to keep the stored values
+            pixels = np.rint((pixels - self.intercept) / self.slope)
+        self.volume[index] = pixels
+        self.slice_ranges[index] = (
+            int(self.volume[index].min()),
+            int(self.volume[index].max()),
+        )
+        return index
+
+    def decode(self, indices=None, progress_callback=None, cancel_event=None):
+        """
+        Decode the given slices (all of them by default) on a thread pool.
+
+        progress_callback(done, total) is called from the calling thread.
+        Returns False if decoding was cancelled through cancel_event.
+        """
+        if indices is None:
+            indices = range(len(self.files))
+        indices = list(indices)
+        total = len(indices)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.decode_slice, i) for i in indices]
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if progress_callback:
+                    progress_callback(done, total)
+
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    return False
+
+        return True
+
+    def _read_headers(self, files):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            headers = list(executor.map(read_dicom_header, files))
+        return [h for h in headers if h is not None]
+
+    def _select_dtype(self, headers):
+        # GDCM widens rescaled pixels (int16 CT with an intercept comes out as
+        # int32, a fractional slope as float64), so the stored dtype is kept
+        # when the rescale is the same for every slice
+        rescales = {
+            (h.get(RESCALE_SLOPE_TAG), h.get(RESCALE_INTERCEPT_TAG)) for h in headers
+        }
+        stored_dtypes = {h.get("stored_dtype") for h in headers}
+        self.slope, self.intercept = 1.0, 0.0
+        self.dtype = headers[0]["dtype"]
+
+        if len(rescales) != 1 or len(stored_dtypes) != 1 or None in stored_dtypes:
+            return
+        slope, intercept = rescales.pop()
+        try:
+            slope, intercept = float(slope or 1), float(intercept or 0)
+        except ValueError:
+            return
+        if slope == 0 or not np.isfinite([slope, intercept]).all():
+            return
+
+        self.slope, self.intercept = slope, intercept
+        self.dtype = stored_dtypes.pop()
+
+    def _sort_headers(self, headers):
+        try:
+            orientation = _parse_numbers(headers[0][IMAGE_ORIENTATION_TAG])
+            normal = np.cross(orientation[:3], orientation[3:6])
+            positions = [
+                float(np.dot(normal, _parse_numbers(h[IMAGE_POSITION_TAG])))
+                for h in headers
+            ]
+        except (ValueError, IndexError):
+            # No geometry, fall back to the instance numbers
+            self.issues.append("No ImagePositionPatient, sorted by InstanceNumber")
+            positions = [float(h[INSTANCE_NUMBER_TAG] or 0) for h in headers]
+
+        order = np.argsort(positions, kind="stable")
+        headers[:] = [headers[i] for i in order]
+        self.positions = [positions[i] for i in order]
+
+    def _check_slice_spacing(self):
+        if len(self.positions) < 2:
+            return 1.0
+
+        gaps = np.diff(self.positions)
+        spacing = float(np.median(gaps))
+        if spacing <= 0:
+            self.issues.append("Slices share the same position")
+            return 1.0
+
+        duplicates = int(np.sum(gaps < spacing * 0.01))
+        if duplicates:
+            self.issues.append(f"{duplicates} slice(s) with a duplicated position")
+
+        missing = np.round(gaps / spacing).astype(int) - 1
+        for i in np.nonzero(missing > 0)[0]:
+            self.issues.append(
+                f"About {missing[i]} slice(s) missing between "
+                f"{self.positions[i]:.2f} mm and {self.positions[i + 1]:.2f} mm"
+            )
+
+        regular_gaps = gaps[(missing == 0) & (gaps >= spacing * 0.01)]
+        if regular_gaps.size and np.ptp(regular_gaps) > spacing * 0.01:
+            self.issues.append(
+                f"Inconsistent slice spacing ({regular_gaps.min():.3f} "
+                f"to {regular_gaps.max():.3f} mm)"
+            )
+
+        return spacing
+
+
+def read_dicom_header(file_path):
+    """
+    Read the header of a DICOM file without decoding its pixel data.
+
+    Returns a dict of the HEADER_TAGS plus the file, slice shape, in-plane
+    spacing and dtype, or None if the file isn't a readable DICOM image.
+    """
+    reader = sitk.ImageFileReader()
+    reader.SetImageIO("GDCMImageIO")
+    reader.SetFileName(file_path)
+    try:
+        reader.ReadImageInformation()
+    except RuntimeError:
+        return None
+
+    header = {
+        tag: reader.GetMetaData(tag).strip() if reader.HasMetaDataKey(tag) else ""
+        for tag in HEADER_TAGS
+    }
+
+    size = reader.GetSize()
+    header["file"] = file_path
+    header["shape"] = (size[1], size[0])
+    header["spacing"] = reader.GetSpacing()[:2]
+    header["dtype"] = pixel_id_to_dtype(reader.GetPixelID())
+    header["stored_dtype"] = stored_dtype(header)
+    return header
+
+
+def stored_dtype(header):
+    """
+    The dtype of the stored pixel values, before any rescale, or None if it
+    isn't a plain integer type.
+    """
+    try:
+        bits_allocated = int(header[BITS_ALLOCATED_TAG])
+        signed = int(header[PIXEL_REPRESENTATION_TAG]) == 1
+    except ValueError:
+        return None
+    if bits_allocated not in (8, 16, 32):
+        return None
+    return np.dtype(f"{'i' if signed else 'u'}{bits_allocated // 8}")
+
+
+def pixel_id_to_dtype(pixel_id):
+    """The numpy dtype SimpleITK uses for a pixel id."""
+    return sitk.GetArrayViewFromImage(sitk.Image([1, 1], pixel_id)).dtype
+
+
+def _parse_numbers(value):
+    return np.array([float(v) for v in value.split("\\")])
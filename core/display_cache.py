@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class DisplayCache:
+    """
+    Per-plane LRU cache of display-ready slices.
+
+    A display buffer is a slice rotated and transposed into the (x, y) order
+    the viewers show, as a contiguous copy, together with its levels. The
+    key must identify the content of the slice (volume version, slice index,
+    pyramid level, processing state), so that showing a cached slice again
+    only costs the texture upload.
+    """
+
+    def __init__(self, plane_budget=128 * 1024**2):
+        self.plane_budget = plane_budget
+        self.entries = {}
+        self.sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, plane, key):
+        """The cached (image, levels) of a plane, or None."""
+        with self.lock:
+            entries = self.entries.get(plane)
+            if entries is None or key not in entries:
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+
+    def contains(self, plane, key):
+        """Whether a slice is cached, without counting a hit or a miss."""
+        with self.lock:
+            return key in self.entries.get(plane, ())
+
+    def put(self, plane, key, image, levels):
+        with self.lock:
+            entries = self.entries.setdefault(plane, OrderedDict())
+            if key in entries:
+                self.sizes[plane] -= entries[key][0].nbytes
+            entries[key] = (image, levels)
+            self.sizes[plane] = self.sizes.get(plane, 0) + image.nbytes
+
+            while self.sizes[plane] > self.plane_budget and len(entries) > 1:
+                _, (old_image, _) = entries.popitem(last=False)
+                self.sizes[plane] -= old_image.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+
+    @staticmethod
+    def prepare(slice_data, levels=None):
+        """
+        The display buffer and (min, max) levels of a slice. The levels are
+        only computed from the slice if they aren't given.
+        """
+        image = np.ascontiguousarray(np.rot90(slice_data, k=2).T)
+        if levels is None:
+            levels = (image.min(), image.max())
+        return image, (float(levels[0]), float(levels[1]))
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+
+class FilterResultCache:
+    """
+    LRU cache of filtered slices, within a memory budget in bytes.
+
+    The key must identify both the slice and the filters applied to it,
+    e.g. (slice key, processing chain), so that applying the same filters
+    to the same slice again is a lookup. Results bigger than the whole
+    budget aren't kept. Cached results are shared, so they are made
+    read-only.
+    """
+
+    def __init__(self, budget=256 * 1024**2):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """The cached result for a key, or None."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+    def put(self, key, result):
+        if result.nbytes > self.budget:
+            return
+        result.setflags(write=False)
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries[key].nbytes
+            self.entries[key] = result
+            self.size += result.nbytes
+
+            while self.size > self.budget:
+                _, old_result = self.entries.popitem(last=False)
+                self.size -= old_result.nbytes
+
+    def get_or_compute(self, key, compute):
+        """The cached result for a key, computing it with compute() if needed."""
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
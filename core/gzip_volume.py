@@ -0,0 +1,293 @@
+import bisect
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from core.lazy_volume import LazyVolume, read_nifti_header
+
+GZIP_MAGIC = b"\x1f\x8b"
+READ_SIZE = 256 * 1024
+# Upper bound on the bytes inflated per step, so highly compressible data
+# (e.g. empty background) doesn't produce huge blocks at once
+BLOCK_SIZE = 1024**2
+
+# Indexes are shared by path until the file changes, so reopening a file
+# doesn't have to build its index again
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_gzip_index(file_path):
+    """The shared GzipIndex of a file."""
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            # The index of an older version of the file is no use anymore
+            for old_key in [k for k in _indexes if k[0] == path]:
+                del _indexes[old_key]
+            index = _indexes[key] = GzipIndex(path)
+        return index
+
+
+class GzipIndex:
+    """
+    Access points into a gzip file, for reading any range of its
+    decompressed bytes without inflating it from the start.
+
+    An access point is a copy of the decompressor state taken every
+    `spacing` decompressed bytes. Points are added by whatever inflates the
+    file past the last one, so the first sequential read builds the index,
+    and later reads only inflate from the access point before them.
+    """
+
+    def __init__(self, file_path, spacing=4 * 1024**2):
+        self.file_path = file_path
+        self.spacing = spacing
+        self.lock = threading.Lock()
+
+        # Decompressed offsets and their (compressed offset, decompressor)
+        self.offsets = [0]
+        self.points = [(0, zlib.decompressobj(zlib.MAX_WBITS | 16))]
+        self.size = None
+
+    @property
+    def complete(self):
+        return self.size is not None
+
+    def covers(self, offset):
+        """Whether offset can be read without extending the index."""
+        return self.complete or offset < self.offsets[-1] + self.spacing
+
+    def read(self, offset, length):
+        end = offset + length
+        out = bytearray()
+        for block_offset, data in self.inflate(offset):
+            out += data[max(0, offset - block_offset) : end - block_offset]
+            if block_offset + len(data) >= end:
+                break
+        return bytes(out)
+
+    def inflate(self, offset=0):
+        """
+        Yield (offset, data) blocks of decompressed bytes, starting from the
+        access point before offset.
+        """
+        with self.lock:
+            i = bisect.bisect_right(self.offsets, offset) - 1
+            uncompressed_offset = self.offsets[i]
+            compressed_offset, decompressor = self.points[i]
+            decompressor = decompressor.copy()
+
+        with open(self.file_path, "rb") as f:
+            f.seek(compressed_offset)
+            pending = b""
+            while True:
+                if not pending:
+                    pending = f.read(READ_SIZE)
+                    if not pending:
+                        data = decompressor.flush()
+                        if data:
+                            yield uncompressed_offset, data
+                            uncompressed_offset += len(data)
+                        self.size = uncompressed_offset
+                        return
+
+                data = decompressor.decompress(pending, BLOCK_SIZE)
+                compressed_offset += len(pending) - len(decompressor.unconsumed_tail)
+                pending = decompressor.unconsumed_tail
+
+                if decompressor.eof:
+                    # Concatenated gzip members (as written by pigz or bgzip)
+                    # continue the same decompressed stream
+                    pending = decompressor.unused_data or f.read(READ_SIZE)
+                    compressed_offset -= len(decompressor.unused_data)
+                    if pending[:2] != GZIP_MAGIC:
+                        pending = b""
+                        f.seek(0, os.SEEK_END)
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+                if data:
+                    yield uncompressed_offset, data
+                    uncompressed_offset += len(data)
+                self._add_point(uncompressed_offset, compressed_offset, decompressor)
+
+    def _add_point(self, uncompressed_offset, compressed_offset, decompressor):
+        if uncompressed_offset < self.offsets[-1] + self.spacing:
+            return
+        with self.lock:
+            if uncompressed_offset >= self.offsets[-1] + self.spacing:
+                self.offsets.append(uncompressed_offset)
+                self.points.append((compressed_offset, decompressor.copy()))
+
+
+class GzipNiftiData:
+    """
+    Raw voxels of a .nii.gz file, read through its GzipIndex.
+
+    An axial slice is inflated on its own from the access point before it.
+    Any other slice needs the whole volume, which decode() inflates into
+    memory in a single pass (building the index on the way); while it runs,
+    reads see the slices inflated so far.
+    """
+
+    def __init__(self, file_path, offset, dtype, shape):
+        self.index = get_gzip_index(file_path)
+        self.offset = offset
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.slice_nbytes = int(np.prod(self.shape[1:])) * self.dtype.itemsize
+
+        # Zero pages are only allocated once they are written
+        self.volume = np.zeros(self.shape, dtype=self.dtype)
+        self.loaded_slices = 0
+        self.loading = False
+        self.claimed = False
+        self.condition = threading.Condition()
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def complete(self):
+        return self.loaded_slices == self.shape[0]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        self.decode()
+        array = self.volume
+        if dtype is not None:
+            array = array.astype(dtype, copy=False)
+        return array
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+
+        if key and isinstance(key[0], (int, np.integer)):
+            index = int(key[0])
+            if index < 0:
+                index += self.shape[0]
+            if not 0 <= index < self.shape[0]:
+                raise IndexError(f"index {index} is out of bounds")
+            return self.read_slice(index)[key[1:]]
+
+        with self.condition:
+            started = self.loading or self.loaded_slices > 0
+        if not started:
+            self.decode()
+        return self.volume[key]
+
+    def read_slice(self, index):
+        slice_offset = self.offset + index * self.slice_nbytes
+        with self.condition:
+            # A running pass that hasn't indexed the slice yet gets there first
+            while (
+                self.loading
+                and self.loaded_slices <= index
+                and not self.index.covers(slice_offset)
+            ):
+                self.condition.wait()
+            if index < self.loaded_slices:
+                return self.volume[index]
+
+        data = self.index.read(slice_offset, self.slice_nbytes)
+        if len(data) < self.slice_nbytes:
+            raise ValueError("The .nii.gz file is truncated")
+        return np.frombuffer(data, dtype=self.dtype).reshape(self.shape[1:])
+
+    def claim(self):
+        """
+        Reserve the pass for the next decode() call, which is about to start
+        in another thread, so that reads wait for it from now on.
+
+        Returns False if the volume is already inflated or being inflated.
+        """
+        with self.condition:
+            if self.loading or self.complete:
+                return False
+            self.loading = self.claimed = True
+            return True
+
+    def decode(self, indices=None, progress_callback=None, cancel_event=None):
+        """
+        Inflate the whole volume into memory.
+
+        gzip can only be inflated in file order, so indices (accepted for
+        ProgressiveLoaderWorker) doesn't change the order. A cancelled pass
+        resumes from the last inflated slice. Returns False if cancel_event
+        is set before it is done.
+        """
+        with self.condition:
+            if self.claimed:
+                self.claimed = False
+            else:
+                while self.loading:
+                    self.condition.wait()
+                if self.complete:
+                    return True
+                self.loading = True
+
+        try:
+            return self._inflate_volume(progress_callback, cancel_event)
+        finally:
+            with self.condition:
+                self.loading = False
+                self.condition.notify_all()
+
+    def _inflate_volume(self, progress_callback, cancel_event):
+        raw = self.volume.reshape(-1).view(np.uint8)
+        position = self.offset + self.loaded_slices * self.slice_nbytes
+        end = self.offset + raw.size
+
+        for block_offset, data in self.index.inflate(position):
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+
+            low = max(position, block_offset)
+            high = min(end, block_offset + len(data))
+            if high > low:
+                raw[low - self.offset : high - self.offset] = np.frombuffer(
+                    data, dtype=np.uint8, count=high - low, offset=low - block_offset
+                )
+                position = high
+
+            loaded_slices = (position - self.offset) // self.slice_nbytes
+            if loaded_slices > self.loaded_slices:
+                with self.condition:
+                    previous, self.loaded_slices = self.loaded_slices, loaded_slices
+                    self.condition.notify_all()
+                if progress_callback:
+                    for done in range(previous + 1, loaded_slices + 1):
+                        progress_callback(done, self.shape[0])
+
+            if position >= end:
+                return True
+
+        raise ValueError("The .nii.gz file is truncated")
+
+
+def open_gzip_nifti(file_path):
+    """
+    Open a .nii.gz file for random-access reads.
+
+    Returns a (LazyVolume, spacing) tuple, or None if the file isn't a 3D
+    NIfTI volume.
+    """
+    header = read_nifti_header(file_path)
+    if header is None:
+        return None
+
+    _, offset, dtype, shape, spacing, slope, intercept = header
+    return (
+        LazyVolume(GzipNiftiData(file_path, offset, dtype, shape), slope, intercept),
+        spacing,
+    )
@@ -1,16 +1,18 @@
 import cv2
 import numpy as np
 from scipy.ndimage import convolve, gaussian_filter, median_filter
-from skimage.restoration import denoise_bilateral
+
+from core.bilateral_grid import bilateral_filter
 
 
 class ImageEnhancer:
     @staticmethod
-    def apply_window(image, window_level=None, window_width=None):
-        min_val = np.min(image)
-        max_val = np.max(image)
-
-        # If window_level and window_width are not provided, use dynamic values
+    def apply_window(image, window_level=None, window_width=None, intensity_range=None):
+        # If window_level and window_width are not provided, use dynamic values,
+        # from the known (min, max) of the image when there is one
+        if window_level is None or window_width is None:
+            min_val, max_val = intensity_range or (np.min(image), np.max(image))
+            min_val, max_val = float(min_val), float(max_val)
         if window_level is None:
             window_level = (min_val + max_val) / 2  # Center of the intensity range
         if window_width is None:
@@ -20,13 +22,13 @@ class ImageEnhancer:
         lower_bound = window_level - window_width / 2
         upper_bound = window_level + window_width / 2
 
-        # Clip the image to the windowing range
-        windowed_image = np.clip(image, lower_bound, upper_bound)
+        # Map the window to 0-255 in float32 whatever the input dtype, and
+        # return it as uint8 for display purposes
+        windowed_image = np.subtract(image, lower_bound, dtype=np.float32)
+        windowed_image *= 255.0 / (upper_bound - lower_bound)
+        np.clip(windowed_image, 0, 255, out=windowed_image)
 
-        # Normalize the image to the range [0, 1] for display purposes
-        windowed_image = (windowed_image - lower_bound) / (upper_bound - lower_bound)
-
-        return windowed_image
+        return windowed_image.astype(np.uint8)
 
     @staticmethod
     def smooth_image(image, sigma=1, strength=1.0):
@@ -54,25 +56,33 @@ class ImageEnhancer:
             sigma_color (float): Range variance for bilateral filter (used for 'Bilateral').
             sigma_spatial (float): Spatial variance for bilateral filter (used for 'Bilateral').
         """
-        filtered_image = image.copy()
-
+        # Both filters return a new array, so the input isn't copied first
         if filter_type == "Median":
-            filtered_image = median_filter(filtered_image, size=parameters[0])
+            filtered_image = median_filter(image, size=parameters[0])
         elif filter_type == "Bilateral":
-            filtered_image = denoise_bilateral(
-                filtered_image,
+            # A bilateral grid approximation of skimage's denoise_bilateral
+            filtered_image = bilateral_filter(
+                image,
                 sigma_color=parameters[0],
                 sigma_spatial=parameters[1],
             )
+            if np.issubdtype(image.dtype, np.integer):
+                # Back from img_as_float units to the intensities of the image,
+                # which the next stages and the whole-volume result are in
+                filtered_image *= np.iinfo(image.dtype).max
         else:
             raise ValueError(f"Unknown filter type: {filter_type}")
 
         return filtered_image
 
     @staticmethod
-    def normalize_image(image):
-        image = np.array(image, dtype=np.float32)
-        normalized_image = (image - np.min(image)) / (np.max(image) - np.min(image))
+    def normalize_image(image, intensity_range=None):
+        # A single float32 copy of the (usually integer) image, scaled in place.
+        # The (min, max) is only computed when it isn't known already.
+        min_val, max_val = intensity_range or (np.min(image), np.max(image))
+        min_val, max_val = float(min_val), float(max_val)
+        normalized_image = np.subtract(image, min_val, dtype=np.float32)
+        normalized_image /= max_val - min_val
         return normalized_image
 
     @staticmethod
@@ -3,11 +3,20 @@ import os
 import cv2
 import SimpleITK as sitk
 
+from core.dicom_series_loader import DicomSeriesLoader
+from core.gzip_volume import open_gzip_nifti
+from core.lazy_volume import map_volume
+
 
 class ImageLoader:
     @staticmethod
-    def load_image(file_path):
+    def load_image(file_path, lazy=False):
         try:
+            if lazy:
+                lazy_volume = ImageLoader.load_lazy(file_path)
+                if lazy_volume is not None:
+                    return lazy_volume
+
             if file_path.lower().endswith(".nii.gz"):
                 ext = ".nii.gz"
             else:
@@ -33,25 +42,74 @@ class ImageLoader:
             raise ValueError(f"Unsupported image format: {e}")
 
     @staticmethod
-    def load_nifti(file_path):
+    def load_nifti(file_path, lazy=False):
         try:
+            if lazy:
+                lazy_volume = ImageLoader.load_lazy(file_path)
+                if lazy_volume is not None:
+                    return lazy_volume
+
             image = sitk.ReadImage(file_path)
             return sitk.GetArrayFromImage(image), image.GetSpacing()
         except Exception as e:
             raise ValueError(f"Failed to load NIfTI file: {e}")
 
     @staticmethod
-    def load_dicom_series(directory):
+    def load_lazy(file_path):
+        """
+        Memory-map uncompressed .nii, .mhd/.raw and raw .nrrd volumes.
+
+        Only the header is parsed, the voxels are paged in by the slices
+        that are actually read. .nii.gz files are read through a gzip index
+        instead. Returns None for files that can't be mapped, so the caller
+        falls back to a full SimpleITK decode.
+        """
         try:
-            reader = sitk.ImageSeriesReader()
-            dicom_files = reader.GetGDCMSeriesFileNames(directory)
-            reader.SetFileNames(dicom_files)
-            image = reader.Execute()
-            image = sitk.ReadImage(dicom_files)
-            return sitk.GetArrayFromImage(image), image.GetSpacing()
+            if file_path.lower().endswith(".nii.gz"):
+                return open_gzip_nifti(file_path)
+            return map_volume(file_path)
+        except Exception:
+            return None
+
+    @staticmethod
+    def load_dicom_series(directory, progress_callback=None, issues=None):
+        """
+        Load a DICOM series in a single pass.
+
+        progress_callback(done, total) reports the decoded slices, and the
+        missing slices or inconsistent spacing found while sorting the series
+        are appended to the issues list if one is given.
+        """
+        try:
+            loader = DicomSeriesLoader()
+            volume, spacing = loader.load(directory, progress_callback)
+            if issues is not None:
+                issues.extend(loader.issues)
+            return volume, spacing
         except Exception as e:
             raise ValueError(f"Failed to load DICOM series: {e}")
 
+    @staticmethod
+    def load_indexed_series(
+        dicom_index, series_uid, progress_callback=None, issues=None
+    ):
+        """
+        Load a series from the headers stored in a DicomIndex.
+
+        The files are neither listed nor have their headers read again, only
+        their pixel data is decoded.
+        """
+        try:
+            loader = DicomSeriesLoader()
+            loader.scan(headers=dicom_index.series_headers(series_uid))
+            loader.allocate()
+            loader.decode(progress_callback=progress_callback)
+            if issues is not None:
+                issues.extend(loader.issues)
+            return loader.rescaled_volume(), loader.spacing
+        except Exception as e:
+            raise ValueError(f"Failed to load indexed DICOM series: {e}")
+
     @staticmethod
     def load_sample_image(file_path):
         try:
@@ -1,9 +1,52 @@
+import numpy as np
+
+from core.lazy_volume import LazyVolume
+from core.oblique_reslicer import PLANES, ObliqueReslicer, rotation_matrix
+from core.plane_layouts import PlaneLayouts
+from core.slab_projector import SlabProjector
+from core.volume_pyramid import VolumePyramid
+from core.volume_statistics import StatisticsBuilder
+
+# The volume axis each plane slices
+PLANE_AXIS = {"axial": 0, "coronal": 1, "sagittal": 2}
+
+
 class ImageProcessor:
     def __init__(self):
+        self.image_data = None
+        self.pyramid = None
+        # Contiguous sagittal and coronal copies of big volumes, if enabled
+        self.use_plane_layouts = True
+        self.layouts = None
+        self.statistics_builder = None
+        # Voxel size (x, y, z), used to resample oblique planes
+        self.spacing = None
+        self.reslicer = None
+        # Rotation of each plane away from its axis-aligned orientation
+        self.rotations = {plane: np.eye(3) for plane in PLANES}
+        # Changes whenever a plane is rotated
+        self.orientation_version = 0
+        # Oblique planes are sampled coarser while they are being moved
+        self.interacting = False
+        # Thick-slab projection shown in each plane, as (mode, thickness in mm)
+        self.slab_settings = {}
+        self.projectors = {}
+        # Changes whenever the voxels of image_data may have changed
+        self.version = 0
+        # Identifies the processing applied to the displayed slices, if any
+        self.processing_state = None
         self.current_slices = {"axial": None, "sagittal": None, "coronal": None}
+        # How many voxels each viewer shows per screen pixel
+        self.voxels_per_pixel = {"axial": 1.0, "sagittal": 1.0, "coronal": 1.0}
 
-    def set_image_data(self, image_data):
+    def set_image_data(
+        self, image_data, pyramid_levels=None, statistics=None, spacing=None
+    ):
         self.image_data = image_data
+        self.spacing = spacing
+        self.version += 1
+        self.reset_rotations()
+        self.projectors.clear()
 
         # It holds the index of the middle slice of each view
         self.current_slices = {
@@ -12,10 +55,223 @@ class ImageProcessor:
             "coronal": self.image_data.shape[1] // 2,
         }
 
+        self.rebuild_pyramid(pyramid_levels)
+        self.rebuild_layouts()
+        self.rebuild_statistics(statistics)
+        self.reslicer = ObliqueReslicer(self.image_data, self.spacing)
+
+    def replace_image_data(self, image_data, pyramid_levels=None, statistics=None):
+        """
+        Swap in another copy of the same volume, keeping the current slices.
+        The pyramid levels and statistics are computed again unless given.
+        """
+        self.image_data = image_data
+        self.invalidate()
+        self.rebuild_pyramid(pyramid_levels)
+        self.rebuild_layouts()
+        self.rebuild_statistics(statistics)
+        self.reslicer = ObliqueReslicer(self.image_data, self.spacing)
+
+    def invalidate(self):
+        """Mark the volume as changed, e.g. while it is still being decoded."""
+        self.version += 1
+
+        # Copies of the previous voxels can't be served anymore
+        if self.layouts is not None:
+            self.layouts.cancel()
+            self.layouts = None
+        if self.statistics_builder is not None:
+            self.statistics_builder.cancel()
+            self.statistics_builder = None
+        # Their running sums and blocks hold the previous voxels
+        self.projectors.clear()
+
+    def rebuild_pyramid(self, levels=None):
+        # Downsampled levels for zoomed-out views are built in the background
+        if self.pyramid is not None:
+            self.pyramid.cancel()
+        self.pyramid = VolumePyramid(self.image_data, levels)
+        self.pyramid.build_async()
+
+    def rebuild_layouts(self):
+        # The copies are built in the background, when memory allows
+        if self.layouts is not None:
+            self.layouts.cancel()
+        self.layouts = None
+        if self.use_plane_layouts:
+            self.layouts = PlaneLayouts(self.image_data)
+            self.layouts.build_async()
+
+    def rebuild_statistics(self, statistics=None):
+        # Slice and volume intensity ranges are read from one pass over it
+        if self.statistics_builder is not None:
+            self.statistics_builder.cancel()
+        self.statistics_builder = StatisticsBuilder(self.image_data, statistics)
+        self.statistics_builder.build_async()
+
+    @property
+    def statistics(self):
+        """The statistics of the volume, or None until they are computed."""
+        if self.statistics_builder is None:
+            return None
+        return self.statistics_builder.statistics
+
+    def get_slice_range(self, plane):
+        """The (min, max) of the current slice of a plane, or None if unknown."""
+        statistics = self.statistics
+        if statistics is None or self.is_oblique(plane) or plane in self.slab_settings:
+            return None
+        return statistics.slice_range(plane, self.current_slices[plane])
+
+    def get_intensity_range(self):
+        """The (min, max) of the whole volume, or None if unknown."""
+        statistics = self.statistics
+        if statistics is None:
+            return None
+        return statistics.min, statistics.max
+
+    def get_slice_shape(self, plane):
+        depth, height, width = self.image_data.shape
+        return {
+            "axial": (height, width),
+            "coronal": (depth, width),
+            "sagittal": (depth, height),
+        }[plane]
+
+    def is_oblique(self, plane):
+        return not np.array_equal(self.rotations[plane], np.eye(3))
+
+    def rotate(self, plane, degrees):
+        """
+        Turn the crosshairs of a plane by degrees, which rotates the two
+        other planes about its normal.
+        """
+        _, _, normal = self.reslicer.basis(plane, self.rotations[plane])
+        rotation = rotation_matrix(normal, degrees)
+        for other_plane in PLANES:
+            if other_plane != plane:
+                self.rotations[other_plane] = rotation @ self.rotations[other_plane]
+        self.orientation_version += 1
+
+    def reset_rotations(self):
+        self.rotations = {plane: np.eye(3) for plane in PLANES}
+        self.orientation_version += 1
+
+    def get_center(self):
+        """The (z, y, x) voxel where the three planes cross."""
+        return (
+            self.current_slices["axial"],
+            self.current_slices["coronal"],
+            self.current_slices["sagittal"],
+        )
+
+    def get_plane_point(self, plane, row, col):
+        """The (z, y, x) voxel shown at a pixel of the slice of a plane."""
+        return self.reslicer.point(
+            plane, self.rotations[plane], self.get_center(), row, col
+        )
+
+    def get_crosshair_angle(self, plane, other_plane):
+        """The angle of the line where other_plane crosses the slice of plane."""
+        return self.reslicer.line_angle(
+            plane,
+            self.rotations[plane],
+            self.rotations[other_plane],
+            other_plane,
+        )
+
+    def get_oblique_slice(self, plane, step=1):
+        statistics = self.statistics
+        return self.reslicer.reslice(
+            plane,
+            self.rotations[plane],
+            self.get_center(),
+            step,
+            fill_value=statistics.min if statistics is not None else 0,
+        )
+
+    def set_slab(self, plane, mode, thickness=None):
+        """
+        Show thick-slab projections ("MIP", "MinIP" or "Average") of a given
+        thickness in mm in a plane, or single slices if mode is None.
+        """
+        if mode is None:
+            self.slab_settings.pop(plane, None)
+        else:
+            self.slab_settings[plane] = (mode, float(thickness))
+        self.projectors.pop(plane, None)
+
+    def get_projector(self, plane):
+        projector = self.projectors.get(plane)
+        if projector is None:
+            projector = self.projectors[plane] = self.create_projector(plane)
+        return projector
+
+    def create_projector(self, plane):
+        mode, thickness = self.slab_settings[plane]
+        axis = PLANE_AXIS[plane]
+        # The spacing is (x, y, z)
+        voxel_size = self.spacing[2 - axis] if self.spacing is not None else 1.0
+        return SlabProjector(
+            lambda start, stop: self.read_slices(plane, start, stop),
+            self.image_data.shape[axis],
+            mode,
+            max(1, round(thickness / voxel_size)),
+        )
+
+    def get_slice_count(self, plane):
+        return self.image_data.shape[PLANE_AXIS[plane]]
+
+    def get_frame_source(self, plane, factor=1):
+        """
+        A function returning the slice of a plane at an index (from a pyramid
+        level) and its levels (or None), safe to call from another thread,
+        or None for an oblique plane. Slabs get their own projector.
+        """
+        if self.is_oblique(plane):
+            return None
+        if plane in self.slab_settings:
+            projector = self.create_projector(plane)
+            return lambda index: (projector.project(index), None)
+        if factor > 1:
+            pyramid = self.pyramid
+            return lambda index: (pyramid.get_slice(plane, index, factor), None)
+
+        statistics = self.statistics
+
+        def read_frame(index):
+            levels = None
+            if statistics is not None:
+                levels = statistics.slice_range(plane, index)
+            return self.read_slices(plane, index, index + 1)[0], levels
+
+        return read_frame
+
+    def read_slices(self, plane, start, stop):
+        """The (count, rows, columns) stack of slices [start, stop) of a plane."""
+        if plane == "axial":
+            return np.asarray(self.image_data[start:stop])
+
+        if self.layouts is not None and plane in self.layouts.layouts:
+            return self.layouts.get_slices(plane, start, stop)
+        if plane == "coronal":
+            return np.asarray(self.image_data[:, start:stop, :]).transpose(1, 0, 2)
+        return np.asarray(self.image_data[:, :, start:stop]).transpose(2, 0, 1)
+
     def get_slice(self, plane):
         if self.image_data is None:
             return None
 
+        if self.is_oblique(plane):
+            return self.get_oblique_slice(plane)
+        if plane in self.slab_settings:
+            return self.get_projector(plane).project(self.current_slices[plane])
+
+        if plane != "axial" and self.layouts is not None:
+            slice_data = self.layouts.get_slice(plane, self.current_slices[plane])
+            if slice_data is not None:
+                return slice_data
+
         if plane == "axial":
             return self.image_data[self.current_slices["axial"], :, :]
         elif plane == "coronal":
@@ -23,6 +279,107 @@ class ImageProcessor:
         elif plane == "sagittal":
             return self.image_data[:, :, self.current_slices["sagittal"]]
 
+    def get_stored_slice(self, plane):
+        """
+        The current slice of a plane as stored in a lazily rescaled volume,
+        and its (slope, intercept) rescale, or None for other volumes and
+        for oblique planes and slabs.
+        """
+        volume = self.image_data
+        if (
+            not isinstance(volume, LazyVolume)
+            or not volume.is_rescaled
+            or self.is_oblique(plane)
+            or plane in self.slab_settings
+        ):
+            return None
+
+        index = self.current_slices[plane]
+        slice_data = None
+        if plane != "axial" and self.layouts is not None:
+            slice_data = self.layouts.get_stored_slice(plane, index)
+        if slice_data is None:
+            axis = PLANE_AXIS[plane]
+            slice_data = volume.data[(slice(None),) * axis + (index,)]
+        return np.asarray(slice_data), (volume.slope, volume.intercept)
+
+    def set_zoom(self, plane, voxels_per_pixel):
+        self.voxels_per_pixel[plane] = voxels_per_pixel
+
+    def get_display_factor(self, plane):
+        """The pyramid level matching the current zoom of a viewer."""
+        if plane in self.slab_settings and not self.is_oblique(plane):
+            # Slabs are projected from the full-resolution slices
+            return 1
+        if self.processing_state is not None:
+            # And slices are processed at full resolution
+            return 1
+
+        factor = 1
+        if self.pyramid is not None:
+            factor = self.pyramid.factor_for(self.voxels_per_pixel[plane])
+        if self.interacting and self.is_oblique(plane):
+            # Every other pixel is sampled while the planes are moved
+            factor = max(factor, 2)
+        return factor
+
+    def slice_position(self, plane, index=None):
+        """Where the current slice of a plane (or the one at index) is."""
+        if self.is_oblique(plane):
+            return (self.orientation_version, self.get_center())
+        if index is not None:
+            return index
+        return self.current_slices[plane]
+
+    def slice_key(self, plane, index=None):
+        """
+        What the full-resolution slice of a plane depends on, for the
+        current slice or the one at index.
+        """
+        return (
+            plane,
+            self.version,
+            self.slice_position(plane, index),
+            self.slab_settings.get(plane),
+        )
+
+    def display_key(self, plane, factor, index=None):
+        """
+        What the displayed slice of a plane at a pyramid level depends on,
+        for the current slice or the one at index.
+        """
+        return (
+            self.version,
+            self.slice_position(plane, index),
+            factor,
+            self.processing_state,
+            self.slab_settings.get(plane),
+        )
+
+    def get_display_slice(self, plane, factor=None):
+        """
+        The current slice of a plane at the resolution its viewer needs.
+
+        Returns the slice and its downsampling factor, the full-resolution
+        data is only read when the viewer is zoomed in far enough. A factor
+        can be given to read a level that was already chosen.
+        """
+        if self.image_data is None:
+            return None, 1
+
+        if factor is None:
+            factor = self.get_display_factor(plane)
+        if self.is_oblique(plane):
+            # Sampled from the full-resolution volume at the step of the level
+            return self.get_oblique_slice(plane, factor), factor
+        if factor == 1:
+            return self.get_slice(plane), 1
+
+        return (
+            self.pyramid.get_slice(plane, self.current_slices[plane], factor),
+            factor,
+        )
+
     def update_slice(self, plane, slice_index):
         max_slices = {
             "axial": self.image_data.shape[0],
@@ -0,0 +1,409 @@
+import gzip
+import os
+import struct
+
+import numpy as np
+
+# NIfTI datatype codes -> numpy dtypes
+NIFTI_DTYPES = {
+    2: np.uint8,
+    4: np.int16,
+    8: np.int32,
+    16: np.float32,
+    64: np.float64,
+    256: np.int8,
+    512: np.uint16,
+    768: np.uint32,
+    1024: np.int64,
+    1280: np.uint64,
+}
+
+# MetaImage element types -> numpy dtypes
+MHD_DTYPES = {
+    "MET_CHAR": np.int8,
+    "MET_UCHAR": np.uint8,
+    "MET_SHORT": np.int16,
+    "MET_USHORT": np.uint16,
+    "MET_INT": np.int32,
+    "MET_UINT": np.uint32,
+    "MET_LONG": np.int32,
+    "MET_ULONG": np.uint32,
+    "MET_LONG_LONG": np.int64,
+    "MET_ULONG_LONG": np.uint64,
+    "MET_FLOAT": np.float32,
+    "MET_DOUBLE": np.float64,
+}
+
+# NRRD type names (all the aliases allowed by the spec) -> numpy dtypes
+NRRD_DTYPES = {
+    "signed char": np.int8,
+    "int8": np.int8,
+    "int8_t": np.int8,
+    "uchar": np.uint8,
+    "unsigned char": np.uint8,
+    "uint8": np.uint8,
+    "uint8_t": np.uint8,
+    "short": np.int16,
+    "short int": np.int16,
+    "signed short": np.int16,
+    "signed short int": np.int16,
+    "int16": np.int16,
+    "int16_t": np.int16,
+    "ushort": np.uint16,
+    "unsigned short": np.uint16,
+    "unsigned short int": np.uint16,
+    "uint16": np.uint16,
+    "uint16_t": np.uint16,
+    "int": np.int32,
+    "signed int": np.int32,
+    "int32": np.int32,
+    "int32_t": np.int32,
+    "uint": np.uint32,
+    "unsigned int": np.uint32,
+    "uint32": np.uint32,
+    "uint32_t": np.uint32,
+    "longlong": np.int64,
+    "long long": np.int64,
+    "long long int": np.int64,
+    "signed long long": np.int64,
+    "signed long long int": np.int64,
+    "int64": np.int64,
+    "int64_t": np.int64,
+    "ulonglong": np.uint64,
+    "unsigned long long": np.uint64,
+    "unsigned long long int": np.uint64,
+    "uint64": np.uint64,
+    "uint64_t": np.uint64,
+    "float": np.float32,
+    "double": np.float64,
+}
+
+# The integer dtypes rescaled data can be kept in, smallest first
+INTEGER_DTYPES = (
+    np.uint8,
+    np.int8,
+    np.uint16,
+    np.int16,
+    np.uint32,
+    np.int32,
+    np.uint64,
+    np.int64,
+)
+
+
+class LazyVolume:
+    """
+    Array-like wrapper around voxel data that is only read when it is sliced.
+
+    The wrapped data is usually a np.memmap, so indexing a single slice only
+    pages in the bytes of that slice. Rescale slope and intercept are applied
+    to the sliced data instead of to the whole volume. Integer slope and
+    intercept keep integer data in the smallest integer dtype that holds every
+    rescaled value, anything else gives float32. stored_range is the
+    (min, max) of the stored values if it is known: int16 CT with an
+    intercept of -1024 stays int16 given its range, but needs int32 for the
+    whole range of int16.
+    """
+
+    def __init__(self, data, slope=1.0, intercept=0.0, stored_range=None):
+        self.data = data
+        self.slope = float(slope)
+        self.intercept = float(intercept)
+        self.stored_range = stored_range
+
+    @property
+    def is_mapped(self):
+        return isinstance(self.data, np.memmap)
+
+    @property
+    def is_rescaled(self):
+        return self.slope != 1.0 or self.intercept != 0.0
+
+    @property
+    def has_integer_rescale(self):
+        return (
+            np.issubdtype(self.data.dtype, np.integer)
+            and self.slope.is_integer()
+            and self.intercept.is_integer()
+        )
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def ndim(self):
+        return self.data.ndim
+
+    @property
+    def dtype(self):
+        if not self.is_rescaled:
+            return self.data.dtype
+        if self.has_integer_rescale:
+            # The smallest integer dtype holding the rescale of every stored
+            # value, so that no rescaled value wraps around
+            info = np.iinfo(self.data.dtype)
+            stored_range = self.stored_range or (info.min, info.max)
+            ends = [
+                int(value) * int(self.slope) + int(self.intercept)
+                for value in stored_range
+            ]
+            low, high = min(ends), max(ends)
+            for dtype in INTEGER_DTYPES:
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    return np.dtype(dtype)
+            return np.dtype(np.float64)
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        return self.rescale(np.asarray(self.data[key]))
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.rescale(np.asarray(self.data))
+        if dtype is not None:
+            array = array.astype(dtype, copy=False)
+        return array
+
+    def rescale(self, array):
+        """An array of stored values (read from data) with the rescale applied."""
+        if not self.is_rescaled:
+            return array
+
+        dtype = self.dtype
+        array = array.astype(dtype)
+        if self.slope != 1.0:
+            array *= dtype.type(self.slope)
+        if self.intercept != 0.0:
+            array += dtype.type(self.intercept)
+        return array
+
+
+def map_volume(file_path):
+    """
+    Memory-map an uncompressed volume without decoding it.
+
+    Returns a (LazyVolume, spacing) tuple, or None if the file is not
+    something that can be mapped directly (compressed, 4D, unknown type, ...)
+    so that the caller can fall back to a full decode.
+    """
+    lower_path = file_path.lower()
+
+    if lower_path.endswith(".nii"):
+        header = read_nifti_header(file_path)
+    elif lower_path.endswith(".mhd"):
+        header = read_mhd_header(file_path)
+    elif lower_path.endswith(".nrrd"):
+        header = read_nrrd_header(file_path)
+    else:
+        return None
+
+    if header is None:
+        return None
+
+    data_path, offset, dtype, shape, spacing, slope, intercept = header
+
+    # A file that is shorter than its header claims can't be mapped
+    if os.path.getsize(data_path) < offset + int(np.prod(shape)) * dtype.itemsize:
+        return None
+
+    data = np.memmap(data_path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    return LazyVolume(data, slope, intercept), spacing
+
+
+def read_nifti_header(file_path):
+    """
+    Parse a single-file NIfTI-1 or NIfTI-2 header, plain or gzip-compressed.
+
+    For a .nii.gz file the offset is into the decompressed stream.
+    """
+    opener = gzip.open if file_path.lower().endswith(".gz") else open
+    with opener(file_path, "rb") as f:
+        raw_header = f.read(540)
+
+    if len(raw_header) < 348:
+        return None
+
+    # The header size field doubles as the byte order marker
+    for endian in ("<", ">"):
+        (header_size,) = struct.unpack(endian + "i", raw_header[:4])
+        if header_size in (348, 540):
+            break
+    else:
+        return None
+
+    if header_size == 348:
+        datatype = struct.unpack_from(endian + "h", raw_header, 70)[0]
+        dims = struct.unpack_from(endian + "8h", raw_header, 40)
+        pixdim = struct.unpack_from(endian + "8f", raw_header, 76)
+        vox_offset = int(struct.unpack_from(endian + "f", raw_header, 108)[0])
+        slope, intercept = struct.unpack_from(endian + "2f", raw_header, 112)
+    else:
+        datatype = struct.unpack_from(endian + "h", raw_header, 12)[0]
+        dims = struct.unpack_from(endian + "8q", raw_header, 16)
+        pixdim = struct.unpack_from(endian + "8d", raw_header, 104)
+        vox_offset = struct.unpack_from(endian + "q", raw_header, 168)[0]
+        slope, intercept = struct.unpack_from(endian + "2d", raw_header, 176)
+
+    if datatype not in NIFTI_DTYPES:
+        return None
+
+    # Only 3D volumes (or 4D with a single time point) are mapped
+    ndim = dims[0]
+    if ndim < 2 or any(d > 1 for d in dims[4 : ndim + 1]):
+        return None
+
+    nx, ny = dims[1], dims[2]
+    nz = dims[3] if ndim >= 3 else 1
+
+    # A zero slope means "no scaling" in the NIfTI standard
+    if slope == 0 or not np.isfinite(slope):
+        slope, intercept = 1.0, 0.0
+
+    dtype = np.dtype(NIFTI_DTYPES[datatype]).newbyteorder(endian)
+    spacing = tuple(abs(float(p)) or 1.0 for p in pixdim[1:4])
+
+    return file_path, vox_offset, dtype, (nz, ny, nx), spacing, slope, intercept
+
+
+def read_mhd_header(file_path):
+    """
+    Parse a MetaImage (.mhd) header that points to raw voxel data.
+    """
+    fields = {}
+    header_length = 0
+
+    with open(file_path, "rb") as f:
+        for line in f:
+            header_length += len(line)
+            key, _, value = line.decode("latin-1").partition("=")
+            key, value = key.strip(), value.strip()
+            fields[key] = value
+            # ElementDataFile is always the last field of the header
+            if key == "ElementDataFile":
+                break
+
+    if fields.get("CompressedData", "False").lower() == "true":
+        return None
+    if int(fields.get("ElementNumberOfChannels", 1)) != 1:
+        return None
+
+    element_type = fields.get("ElementType")
+    data_file = fields.get("ElementDataFile")
+    if element_type not in MHD_DTYPES or not data_file or data_file == "LIST":
+        return None
+
+    sizes = [int(s) for s in fields["DimSize"].split()]
+    if len(sizes) < 2 or any(s > 1 for s in sizes[3:]):
+        return None
+    sizes = (sizes + [1])[:3]
+
+    spacing_field = fields.get("ElementSpacing") or fields.get("ElementSize")
+    spacing = [float(s) for s in spacing_field.split()] if spacing_field else []
+    spacing = tuple((spacing + [1.0, 1.0, 1.0])[:3])
+
+    msb = fields.get(
+        "BinaryDataByteOrderMSB", fields.get("ElementByteOrderMSB", "False")
+    )
+    endian = ">" if msb.lower() == "true" else "<"
+    dtype = np.dtype(MHD_DTYPES[element_type]).newbyteorder(endian)
+    shape = (sizes[2], sizes[1], sizes[0])
+
+    if data_file == "LOCAL":
+        data_path = file_path
+        offset = header_length
+    else:
+        data_path = os.path.join(os.path.dirname(file_path), data_file)
+        offset = int(fields.get("HeaderSize", 0))
+
+    # HeaderSize = -1 means the voxels are at the end of the data file
+    if offset < 0:
+        offset = os.path.getsize(data_path) - int(np.prod(shape)) * dtype.itemsize
+
+    return data_path, offset, dtype, shape, spacing, 1.0, 0.0
+
+
+def read_nrrd_header(file_path):
+    """
+    Parse a NRRD header with raw encoding (attached or detached data).
+    """
+    fields = {}
+    header_length = 0
+
+    with open(file_path, "rb") as f:
+        magic = f.readline()
+        header_length += len(magic)
+        if not magic.startswith(b"NRRD"):
+            return None
+
+        for line in f:
+            header_length += len(line)
+            line = line.decode("latin-1").rstrip("\r\n")
+            # A blank line ends the header of an attached NRRD
+            if not line:
+                break
+            # Comments and key/value pairs (key:=value) are not fields
+            if line.startswith("#") or ":=" in line:
+                continue
+            key, _, value = line.partition(":")
+            fields[key.strip().lower()] = value.strip()
+
+    if fields.get("encoding", "raw") != "raw":
+        return None
+
+    dtype = NRRD_DTYPES.get(fields.get("type", "").lower())
+    if dtype is None:
+        return None
+
+    sizes = [int(s) for s in fields["sizes"].split()]
+    if len(sizes) < 2 or any(s > 1 for s in sizes[3:]):
+        return None
+    sizes = (sizes + [1])[:3]
+
+    spacing = _nrrd_spacing(fields)
+
+    endian = ">" if fields.get("endian") == "big" else "<"
+    dtype = np.dtype(dtype).newbyteorder(endian)
+    shape = (sizes[2], sizes[1], sizes[0])
+
+    data_file = fields.get("data file") or fields.get("datafile")
+    if data_file:
+        # Lists and formatted file names ("LIST", "%03d.raw ...") aren't mapped
+        if data_file.startswith("LIST") or " " in data_file:
+            return None
+        data_path = os.path.join(os.path.dirname(file_path), data_file)
+        offset = int(fields.get("byte skip", 0))
+    else:
+        data_path = file_path
+        offset = header_length + int(fields.get("byte skip", 0))
+
+    if int(fields.get("line skip", 0)) != 0:
+        return None
+
+    # byte skip = -1 means the voxels are at the end of the data file
+    if offset < 0 or fields.get("byte skip") == "-1":
+        offset = os.path.getsize(data_path) - int(np.prod(shape)) * dtype.itemsize
+
+    return data_path, offset, dtype, shape, spacing, 1.0, 0.0
+
+
+def _nrrd_spacing(fields):
+    if "space directions" in fields:
+        spacing = []
+        for direction in fields["space directions"].split():
+            if direction == "none":
+                continue
+            vector = [float(v) for v in direction.strip("()").split(",")]
+            spacing.append(float(np.linalg.norm(vector)))
+    elif "spacings" in fields:
+        spacing = [float(s) for s in fields["spacings"].split() if s != "nan"]
+    else:
+        spacing = []
+
+    return tuple((spacing + [1.0, 1.0, 1.0])[:3])
@@ -0,0 +1,209 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.ndimage import map_coordinates
+
+from core.gzip_volume import GzipNiftiData
+from core.lazy_volume import LazyVolume
+
+PLANES = ("axial", "coronal", "sagittal")
+# The (z, y, x) volume axes along the rows and columns of the slices of a
+# plane, and the axis the plane cuts
+PLANE_AXES = {
+    "axial": (1, 2, 0),
+    "coronal": (0, 2, 1),
+    "sagittal": (0, 1, 2),
+}
+# Rows of a slice sampled at a time from volumes that aren't arrays
+BAND_ROWS = 32
+
+
+class ObliqueReslicer:
+    """
+    Resamples oblique planes through a volume with trilinear interpolation.
+
+    A plane is its axis-aligned orientation turned by a rotation (a 3x3
+    matrix acting on (z, y, x) millimeter coordinates), through a center
+    voxel that keeps the pixel it has in the axis-aligned slice. Slices have
+    the shape of the axis-aligned ones, so they are displayed the same way.
+
+    The sample coordinates of a plane only depend on its orientation and
+    sampling step, so they are computed once and cached, and moving the
+    center only offsets them. A step of 2 or more samples every step-th
+    pixel, for a fast preview while a plane is being moved.
+
+    Samples are read without a dense copy of the volume: the stored voxels
+    of a LazyVolume are sampled and then rescaled, and volumes that aren't
+    arrays (e.g. a ChunkedVolume) are read one band of rows at a time.
+    """
+
+    def __init__(self, volume, spacing=None, max_grids=8):
+        self.volume = volume
+        # Voxel size along the (z, y, x) axes, the spacing is (x, y, z)
+        self.spacing = np.array(
+            spacing[::-1] if spacing is not None else (1.0, 1.0, 1.0), dtype=float
+        )
+        self.max_grids = max_grids
+        self.grids = OrderedDict()
+        self.lock = threading.Lock()
+
+    def basis(self, plane, rotation):
+        """
+        The voxel steps (z, y, x) of one pixel along the rows and columns of
+        a plane, and its unit normal in millimeters.
+        """
+        row_axis, col_axis, normal_axis = PLANE_AXES[plane]
+        axes = np.eye(3)
+        row_step = self.spacing[row_axis] * (rotation @ axes[row_axis]) / self.spacing
+        col_step = self.spacing[col_axis] * (rotation @ axes[col_axis]) / self.spacing
+        return row_step, col_step, rotation @ axes[normal_axis]
+
+    def origin(self, plane, rotation, center):
+        """The voxel coordinates of the first pixel of a plane through center."""
+        row_axis, col_axis, _ = PLANE_AXES[plane]
+        row_step, col_step, _ = self.basis(plane, rotation)
+        return (
+            np.asarray(center, dtype=float)
+            - center[row_axis] * row_step
+            - center[col_axis] * col_step
+        )
+
+    def slice_shape(self, plane):
+        row_axis, col_axis, _ = PLANE_AXES[plane]
+        return self.volume.shape[row_axis], self.volume.shape[col_axis]
+
+    def grid(self, plane, rotation, step):
+        """The (3, rows, columns) voxel offsets of the samples from the origin."""
+        key = (plane, rotation.tobytes(), step)
+        with self.lock:
+            grid = self.grids.get(key)
+            if grid is not None:
+                self.grids.move_to_end(key)
+                return grid
+
+        rows, cols = self.slice_shape(plane)
+        row_step, col_step, _ = self.basis(plane, rotation)
+        row_indices = np.arange(0, rows, step, dtype=float)
+        col_indices = np.arange(0, cols, step, dtype=float)
+        grid = (
+            row_step[:, None, None] * row_indices[None, :, None]
+            + col_step[:, None, None] * col_indices[None, None, :]
+        )
+
+        with self.lock:
+            self.grids[key] = grid
+            while len(self.grids) > self.max_grids:
+                self.grids.popitem(last=False)
+        return grid
+
+    def source(self):
+        """
+        The array-like the samples are read from, and the (slope, intercept)
+        rescale of its values, or None. The array-like is None while a
+        .nii.gz volume isn't being inflated, which would block until done.
+        """
+        data, rescale = self.volume, None
+        if isinstance(data, LazyVolume):
+            if data.is_rescaled:
+                rescale = (data.slope, data.intercept)
+            data = data.data
+        if isinstance(data, GzipNiftiData):
+            # The slices inflated so far are read while it is being inflated
+            data = data.volume if data.loading or data.complete else None
+        return data, rescale
+
+    def reslice(self, plane, rotation, center, step=1, fill_value=0):
+        """
+        The slice of an oblique plane through center, sampling every step-th
+        pixel. Samples outside the volume get fill_value.
+        """
+        grid = self.grid(plane, rotation, step)
+        data, rescale = self.source()
+        if data is None:
+            return np.full(grid.shape[1:], fill_value, dtype=self.volume.dtype)
+
+        coordinates = grid + self.origin(plane, rotation, center)[:, None, None]
+        if rescale is None:
+            return self.sample(data, coordinates, fill_value, data.dtype)
+
+        # Interpolated between stored values, then rescaled like the volume
+        slope, intercept = rescale
+        samples = self.sample(
+            data, coordinates, (fill_value - intercept) / slope, np.float64
+        )
+        samples = samples * slope + intercept
+        if self.volume.dtype.kind in "iu":
+            samples = np.rint(samples)
+        return samples.astype(self.volume.dtype)
+
+    def sample(self, data, coordinates, fill_value, dtype):
+        """The trilinear samples of data at (3, rows, columns) coordinates."""
+        if isinstance(data, np.ndarray):
+            return map_coordinates(
+                data,
+                coordinates,
+                output=dtype,
+                order=1,
+                mode="constant",
+                cval=fill_value,
+                prefilter=False,
+            )
+
+        # Each band reads the box of voxels its samples fall between, which
+        # meets the volume edges wherever the samples do
+        shape = np.array(data.shape)
+        samples = np.empty(coordinates.shape[1:], dtype=dtype)
+        for start in range(0, coordinates.shape[1], BAND_ROWS):
+            band = coordinates[:, start : start + BAND_ROWS]
+            lower = np.floor(band.min(axis=(1, 2))).astype(int)
+            upper = np.floor(band.max(axis=(1, 2))).astype(int) + 2
+            lower = np.clip(lower, 0, shape - 1)
+            upper = np.maximum(np.minimum(upper, shape), lower + 1)
+            box = np.asarray(data[tuple(map(slice, lower, upper))])
+            samples[start : start + BAND_ROWS] = map_coordinates(
+                box,
+                band - lower[:, None, None],
+                output=dtype,
+                order=1,
+                mode="constant",
+                cval=fill_value,
+                prefilter=False,
+            )
+        return samples
+
+    def point(self, plane, rotation, center, row, col):
+        """The (z, y, x) voxel coordinates of a pixel of a plane through center."""
+        row_step, col_step, _ = self.basis(plane, rotation)
+        return self.origin(plane, rotation, center) + row * row_step + col * col_step
+
+    def line_angle(self, plane, rotation, other_rotation, other_plane):
+        """
+        The angle (degrees, counterclockwise from the columns) at which
+        other_plane crosses the slices of plane.
+        """
+        row_axis, col_axis, _ = PLANE_AXES[plane]
+        _, _, normal = self.basis(plane, rotation)
+        _, _, other_normal = self.basis(other_plane, other_rotation)
+        direction = np.cross(normal, other_normal)
+
+        # In pixels of the plane, which are spacing-sized along each direction
+        axes = np.eye(3)
+        rows = direction @ (rotation @ axes[row_axis]) / self.spacing[row_axis]
+        cols = direction @ (rotation @ axes[col_axis]) / self.spacing[col_axis]
+        return float(np.degrees(np.arctan2(rows, cols))) % 180
+
+
+def rotation_matrix(axis, degrees):
+    """The rotation by degrees about a (z, y, x) axis."""
+    axis = np.asarray(axis, dtype=float)
+    axis = axis / np.linalg.norm(axis)
+    angle = np.radians(degrees)
+    cross = np.array(
+        [
+            [0.0, -axis[2], axis[1]],
+            [axis[2], 0.0, -axis[0]],
+            [-axis[1], axis[0], 0.0],
+        ]
+    )
+    return np.eye(3) + np.sin(angle) * cross + (1 - np.cos(angle)) * (cross @ cross)
@@ -0,0 +1,113 @@
+import os
+import threading
+
+import numpy as np
+
+from core.gzip_volume import GzipNiftiData
+from core.lazy_volume import LazyVolume
+
+# Axes of an axial slab that become (slice index, rows, columns) of a plane
+PLANE_AXES = {"sagittal": (2, 0, 1), "coronal": (1, 0, 2)}
+
+
+class PlaneLayouts:
+    """
+    Transposed, contiguous copies of a volume for sagittal and coronal slicing.
+
+    volume[:, :, k] and volume[:, k, :] are strided reads across the whole
+    volume, while layouts["sagittal"][k] and layouts["coronal"][k] are single
+    contiguous chunks, as fast as axial slices. The copies are built in one
+    pass over axial slabs, and only for the planes that fit in a fraction of
+    the available memory. A plane is served from its copy once it is complete.
+
+    A lazily rescaled volume (LazyVolume) is copied as stored, usually in a
+    smaller dtype, and its slices are rescaled as they are read. Memory-mapped
+    and inflated .nii.gz volumes are copied like in-memory ones. A volume
+    kept compressed (ChunkedVolume) gets no copies, which would undo its
+    small footprint, and neither does a .nii.gz volume until it is inflated.
+    """
+
+    # Smaller volumes are sliced fast enough in any direction
+    MIN_NBYTES = 64 * 1024**2
+
+    def __init__(self, volume, memory_fraction=0.25):
+        self.volume = volume
+        # The stored voxels that are copied, and what rescales their slices
+        self.data = volume.data if isinstance(volume, LazyVolume) else volume
+        self.rescale = volume.rescale if isinstance(volume, LazyVolume) else None
+        if isinstance(self.data, GzipNiftiData) and self.data.complete:
+            self.data = self.data.volume
+        self.memory_fraction = memory_fraction
+        self.layouts = {}
+        self.cancel_event = threading.Event()
+
+    def planes_to_build(self):
+        """The planes whose copy fits in the memory budget, slowest first."""
+        if not isinstance(self.data, np.ndarray):
+            return []
+        nbytes = self.data.nbytes
+        if nbytes < self.MIN_NBYTES:
+            return []
+
+        memory = available_memory()
+        if memory is None:
+            return []
+        count = int(memory * self.memory_fraction // nbytes)
+        return list(PLANE_AXES)[:count]
+
+    def build(self, slab_size=16):
+        planes = self.planes_to_build()
+        if not planes:
+            return
+
+        depth = self.data.shape[0]
+        copies = {
+            plane: np.empty(
+                [self.data.shape[axis] for axis in PLANE_AXES[plane]],
+                dtype=self.data.dtype,
+            )
+            for plane in planes
+        }
+        for start in range(0, depth, slab_size):
+            if self.cancel_event.is_set():
+                return
+            slab = np.asarray(self.data[start : start + slab_size])
+            for plane, copy in copies.items():
+                copy[:, start : start + len(slab)] = slab.transpose(PLANE_AXES[plane])
+
+        self.layouts.update(copies)
+
+    def build_async(self):
+        thread = threading.Thread(target=self.build, daemon=True)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def get_slice(self, plane, index):
+        """The slice from the copy of a plane, or None if it has none."""
+        slices = self.get_slices(plane, index, index + 1)
+        return None if slices is None else slices[0]
+
+    def get_stored_slice(self, plane, index):
+        """The slice from the copy of a plane as stored, or None."""
+        layout = self.layouts.get(plane)
+        return None if layout is None else layout[index]
+
+    def get_slices(self, plane, start, stop):
+        """The slices [start, stop) from the copy of a plane, or None."""
+        layout = self.layouts.get(plane)
+        if layout is None:
+            return None
+        if self.rescale is not None:
+            return self.rescale(layout[start:stop])
+        return layout[start:stop]
+
+
+def available_memory():
+    """Physical memory free for new allocations, or None if it is unknown."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
@@ -0,0 +1,143 @@
+import numpy as np
+
+from core.filter_cache import FilterResultCache
+from core.image_enhancer import ImageEnhancer
+from core.window_lut import WindowLUT
+
+# The order the stages of a pipeline always run in
+STAGES = ("Denoising", "Smoothing", "Sharpening", "Windowing")
+
+
+class ProcessingPipeline:
+    """
+    An ordered chain of slice processing stages, evaluated lazily per slice.
+
+    Each stage is set with its parameters: (filter type, parameters) for
+    Denoising, (sigma, strength) for Smoothing, strength for Sharpening and
+    (level, width) for Windowing. The chain is described by
+    ((name, parameters), ...) in the order of STAGES, and is only run on the
+    slices that are asked for. The output of every stage is cached under
+    the slice and the chain up to that stage, so changing the parameters
+    of a stage only reruns it and the stages after it: windowing after a
+    slow denoising starts from the cached denoised slice.
+    """
+
+    def __init__(self, cache=None, window_lut=None, order=STAGES):
+        self.cache = cache or FilterResultCache()
+        self.window_lut = window_lut or WindowLUT()
+        self.order = order
+        self.parameters = {}
+
+    @property
+    def stages(self):
+        return self.with_stage()
+
+    def with_stage(self, name=None, parameters=None):
+        """The chain with a stage set to other parameters, or removed with None."""
+        stage_parameters = dict(self.parameters)
+        if name is not None:
+            stage_parameters[name] = parameters
+        return tuple(
+            (stage, stage_parameters[stage])
+            for stage in self.order
+            if stage_parameters.get(stage) is not None
+        )
+
+    def set_stage(self, name, parameters):
+        if parameters is None:
+            self.parameters.pop(name, None)
+        else:
+            self.parameters[name] = parameters
+
+    def clear(self):
+        self.parameters.clear()
+        self.cache.clear()
+
+    @staticmethod
+    def levels(stages):
+        """The display levels of the output of a chain, if they are fixed."""
+        if stages and stages[-1][0] == "Windowing":
+            return (0, 255)
+        return None
+
+    def run_stage(self, name, parameters, image, factor=1):
+        """
+        A stage on an image downsampled by factor, with the parameters given
+        in pixels scaled accordingly.
+        """
+        if name == "Denoising":
+            filter_type, filter_parameters = parameters
+            if filter_type == "Median":
+                filter_parameters = [max(1, round(filter_parameters[0] / factor))]
+            else:
+                filter_parameters = [
+                    filter_parameters[0],
+                    filter_parameters[1] / factor,
+                ]
+            return ImageEnhancer.denoise(image, filter_type, filter_parameters)
+        if name == "Smoothing":
+            sigma, strength = parameters
+            return ImageEnhancer.smooth_image(image, sigma / factor, strength)
+        if name == "Sharpening":
+            return ImageEnhancer.sharpen_image(image, parameters)
+        if name == "Windowing":
+            window_level, window_width = parameters
+            # 8 and 16-bit images through a lookup table, into their own buffer
+            if WindowLUT.supports(image.dtype):
+                return self.window_stored(image, None, parameters)
+            return ImageEnhancer.apply_window(image, window_level, window_width)
+        raise ValueError(f"Unknown processing stage: {name}")
+
+    def window_stored(self, image, rescale, parameters):
+        """
+        An 8 or 16-bit image windowed through a lookup table, with its
+        (slope, intercept) rescale, if any, folded into the table.
+        """
+        window_level, window_width = parameters
+        return self.window_lut.apply(
+            image,
+            window_level,
+            window_width,
+            out=np.empty(image.shape, dtype=np.uint8),
+            rescale=rescale,
+        )
+
+    def apply(self, image, stages=None, factor=1):
+        """A chain run on an image, without caching, e.g. for previews."""
+        for name, parameters in self.stages if stages is None else stages:
+            image = self.run_stage(name, parameters, image, factor)
+        return image
+
+    def process(self, slice_key, read_slice, stages=None, read_stored=None):
+        """
+        The output of a chain (the current one by default) for a slice.
+
+        slice_key identifies the unprocessed slice and read_slice() reads
+        it, only if no stage of the chain was cached for it. read_stored()
+        can give the slice as stored and its (slope, intercept) rescale (or
+        None), so that a chain starting with windowing windows the stored
+        values directly, e.g. int16 CT whose rescaled slices are int32.
+        """
+        stages = self.stages if stages is None else stages
+
+        # Start after the longest part of the chain already computed
+        image = None
+        done = len(stages)
+        while done > 0:
+            image = self.cache.get((slice_key, stages[:done]))
+            if image is not None:
+                break
+            done -= 1
+        if image is None and stages and stages[0][0] == "Windowing" and read_stored:
+            stored = read_stored()
+            if stored is not None and WindowLUT.supports(stored[0].dtype):
+                image = self.window_stored(*stored, stages[0][1])
+                self.cache.put((slice_key, stages[:1]), image)
+                done = 1
+        if image is None:
+            image = read_slice()
+
+        for end in range(done + 1, len(stages) + 1):
+            image = self.run_stage(*stages[end - 1], image)
+            self.cache.put((slice_key, stages[:end]), image)
+        return image
@@ -0,0 +1,57 @@
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class ProgressiveLoaderWorker(QThread):
+    """
+    Decode the rest of a DICOM series (or a .nii.gz volume) in the background.
+
+    The loader must already be scanned and allocated, and the slices that
+    are on screen decoded. The remaining slices are decoded from the middle
+    of the series outwards, so the visible part of the sagittal and coronal
+    views grows around the crosshair.
+    """
+
+    slices_loaded = pyqtSignal(int, int)  # Decoded slices so far, total
+    loading_finished = pyqtSignal()
+    loading_failed = pyqtSignal(str)
+
+    def __init__(self, loader, decoded_indices=(), updates=20):
+        super().__init__()
+        self.loader = loader
+        self.cancel_event = threading.Event()
+
+        slice_count = len(loader.volume)
+        middle = slice_count // 2
+        decoded_indices = set(decoded_indices)
+        self.indices = sorted(
+            (i for i in range(slice_count) if i not in decoded_indices),
+            key=lambda i: abs(i - middle),
+        )
+        self.already_decoded = slice_count - len(self.indices)
+
+        # Number of progress signals emitted over the whole series
+        self.update_step = max(1, len(self.indices) // updates)
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.wait()
+
+    def report_progress(self, done, total):
+        if done % self.update_step == 0 or done == total:
+            self.slices_loaded.emit(
+                self.already_decoded + done, self.already_decoded + total
+            )
+
+    def run(self):
+        try:
+            completed = self.loader.decode(
+                self.indices,
+                progress_callback=self.report_progress,
+                cancel_event=self.cancel_event,
+            )
+            if completed:
+                self.loading_finished.emit()
+        except Exception as e:
+            self.loading_failed.emit(f"Failed to load volume: {e}")
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+
+import numpy as np
+
+MODES = ("MIP", "MinIP", "Average")
+
+
+class SlabProjector:
+    """
+    Thick-slab projections (maximum, minimum or mean) along one plane.
+
+    read_slices(start, stop) returns the (count, rows, columns) stack of the
+    slices of the plane between start and stop. The slab of a slice index is
+    the thickness slices centered on it, cropped at the ends of the volume.
+
+    Moving the slab by a few slices doesn't project it again:
+    - Average keeps the running sum of the slab and adds the slices entering
+      it and subtracts the ones leaving it.
+    - MIP and MinIP split the slices into blocks of thickness slices and keep
+      the running max (min) of the blocks from their start and from their
+      end (van Herk / Gil-Werman). A slab spans at most two blocks, so its
+      projection is one np.maximum of a suffix of the first and a prefix of
+      the second, and each block is read once while scrolling through it.
+    """
+
+    # Blocks kept for MIP and MinIP, the two a slab spans and one to scroll back
+    MAX_BLOCKS = 3
+
+    def __init__(self, read_slices, slice_count, mode, thickness):
+        if mode not in MODES:
+            raise ValueError(f"Unknown projection mode: {mode}")
+        self.read_slices = read_slices
+        self.slice_count = slice_count
+        self.mode = mode
+        self.thickness = max(1, min(int(thickness), slice_count))
+
+        self.blocks = OrderedDict()
+        self.sum = None
+        self.sum_range = None
+
+    def slab_range(self, index):
+        start = max(0, index - self.thickness // 2)
+        stop = min(self.slice_count, index - self.thickness // 2 + self.thickness)
+        return start, stop
+
+    def project(self, index):
+        """The projection of the slab centered on a slice."""
+        start, stop = self.slab_range(index)
+        if self.mode == "Average":
+            return self.project_mean(start, stop)
+        return self.project_extreme(start, stop)
+
+    def project_mean(self, start, stop):
+        if self.sum is None or not self.overlaps(start, stop):
+            self.sum = self.sum_slices(start, stop)
+        else:
+            # Only the slices that left or entered the slab are read
+            previous_start, previous_stop = self.sum_range
+            self.sum -= self.sum_slices(previous_start, start)
+            self.sum -= self.sum_slices(stop, previous_stop)
+            self.sum += self.sum_slices(start, previous_start)
+            self.sum += self.sum_slices(previous_stop, stop)
+        self.sum_range = (start, stop)
+        return (self.sum / (stop - start)).astype(np.float32)
+
+    def overlaps(self, start, stop):
+        """Whether updating the running sum reads fewer slices than a new sum."""
+        previous_start, previous_stop = self.sum_range
+        moved_by = abs(start - previous_start) + abs(stop - previous_stop)
+        return (
+            start < previous_stop and previous_start < stop and moved_by < stop - start
+        )
+
+    def sum_slices(self, start, stop):
+        """The float64 sum of the slices in [start, stop), 0 if there are none."""
+        if start >= stop:
+            return 0.0
+        return self.read_slices(start, stop).sum(axis=0, dtype=np.float64)
+
+    def project_extreme(self, start, stop):
+        reduce = np.maximum if self.mode == "MIP" else np.minimum
+        first_block, last_block = start // self.thickness, (stop - 1) // self.thickness
+
+        if first_block == last_block:
+            block_start = first_block * self.thickness
+            prefix, suffix = self.block(first_block)
+            if start == block_start:
+                return prefix[stop - 1 - block_start]
+            if stop == min(block_start + self.thickness, self.slice_count):
+                return suffix[start - block_start]
+            # Only a slab cropped by the ends of the volume gets here
+            return reduce.reduce(self.read_slices(start, stop), axis=0)
+
+        _, suffix = self.block(first_block)
+        prefix, _ = self.block(last_block)
+        return reduce(
+            suffix[start - first_block * self.thickness],
+            prefix[stop - 1 - last_block * self.thickness],
+        )
+
+    def block(self, block_index):
+        """The running max (min) of a block from its start, and from its end."""
+        if block_index in self.blocks:
+            self.blocks.move_to_end(block_index)
+            return self.blocks[block_index]
+
+        reduce = np.maximum if self.mode == "MIP" else np.minimum
+        block_start = block_index * self.thickness
+        slices = np.asarray(
+            self.read_slices(
+                block_start, min(block_start + self.thickness, self.slice_count)
+            )
+        )
+        # One ufunc call per slice, reduce.accumulate along the first axis is
+        # many times slower on big slices
+        prefix = np.empty_like(slices)
+        suffix = np.empty_like(slices)
+        prefix[0], suffix[-1] = slices[0], slices[-1]
+        for i in range(1, len(slices)):
+            reduce(prefix[i - 1], slices[i], out=prefix[i])
+            reduce(suffix[-i], slices[-i - 1], out=suffix[-i - 1])
+
+        self.blocks[block_index] = (prefix, suffix)
+        while len(self.blocks) > self.MAX_BLOCKS:
+            self.blocks.popitem(last=False)
+        return prefix, suffix
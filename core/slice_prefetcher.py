@@ -0,0 +1,112 @@
+import math
+import threading
+import time
+
+from core.display_cache import DisplayCache
+
+
+class SlicePrefetcher:
+    """
+    Prepares the slices a scrolling viewer is about to show, in a thread.
+
+    Each scroll step tells it the new slice, the step and how to read and
+    key slices of the plane. It predicts the direction from the step and
+    the speed from the time between steps, and puts the display buffers of
+    the next slices in that direction into the display cache, so showing
+    them is a cache hit. It looks ahead LOOKAHEAD seconds of scrolling at
+    the measured rate, between MIN_DEPTH and MAX_DEPTH slices. A new step
+    replaces the slices still pending from the previous one. A slice that
+    fails to be read or prepared (e.g. the volume was swapped meanwhile)
+    drops the rest of its step, the viewer then shows those slices itself.
+    """
+
+    LOOKAHEAD = 0.5
+    MIN_DEPTH = 2
+    MAX_DEPTH = 32
+    # Steps further apart start a new scroll, at the slowest rate
+    IDLE_TIME = 1.0
+
+    def __init__(self, display_cache):
+        self.display_cache = display_cache
+        # Per plane, the time of the last step and the smoothed slices/second
+        self.scroll_rates = {}
+        self.request = None
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def scroll_rate(self, plane, step):
+        now = time.perf_counter()
+        last_time, rate = self.scroll_rates.get(plane, (None, 0.0))
+        if last_time is None or now - last_time > self.IDLE_TIME:
+            rate = 0.0
+        else:
+            # Exponential moving average, steady against uneven wheel events
+            instant_rate = abs(step) / max(now - last_time, 1e-3)
+            rate = instant_rate if rate == 0.0 else 0.5 * rate + 0.5 * instant_rate
+        self.scroll_rates[plane] = (now, rate)
+        return rate
+
+    def depth(self, rate):
+        return min(
+            self.MAX_DEPTH, max(self.MIN_DEPTH, math.ceil(rate * self.LOOKAHEAD))
+        )
+
+    def scrolled(self, plane, index, step, slice_count, frame_source, make_key):
+        """
+        The viewer of a plane stepped by step slices to index.
+
+        frame_source(index) returns a slice and its levels (or None), and
+        make_key(index) its display cache key. Both run in the thread.
+        """
+        depth = self.depth(self.scroll_rate(plane, step))
+        direction = 1 if step > 0 else -1
+        indices = [
+            index + direction * i
+            for i in range(1, depth + 1)
+            if 0 <= index + direction * i < slice_count
+        ]
+
+        with self.condition:
+            self.request = (plane, indices, frame_source, make_key)
+            self.condition.notify_all()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        try:
+            while True:
+                with self.condition:
+                    while self.request is None and not self.stopped:
+                        self.condition.wait()
+                    if self.stopped:
+                        return
+                    request, self.request = self.request, None
+
+                try:
+                    self.prefetch(*request)
+                except Exception:
+                    continue
+        finally:
+            # The next step starts a new thread if this one ended
+            with self.condition:
+                self.thread = None
+
+    def prefetch(self, plane, indices, frame_source, make_key):
+        for index in indices:
+            # A newer step changes what comes next
+            if self.request is not None or self.stopped:
+                return
+            key = make_key(index)
+            if self.display_cache.contains(plane, key):
+                continue
+            slice_data, levels = frame_source(index)
+            self.display_cache.put(
+                plane, key, *DisplayCache.prepare(slice_data, levels)
+            )
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
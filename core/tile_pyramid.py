@@ -0,0 +1,92 @@
+import threading
+
+import numpy as np
+
+
+class TilePyramid:
+    """
+    Square tiles of a large 2D image at several resolutions.
+
+    Level 1 is the image itself and each next level (2, 4, 8...) is the 2x2
+    block mean of the previous one, until a level fits in a single tile.
+    Levels are built the first time one of their tiles is asked for, from
+    the previous level, so asking for tiles can be left to worker threads.
+    Tile (tx, ty) of a level holds its pixels [tx * tile_size, ...) along
+    the first axis and [ty * tile_size, ...) along the second.
+    """
+
+    def __init__(self, image, tile_size=512):
+        self.tile_size = tile_size
+        self.levels = {1: image}
+        self.lock = threading.RLock()
+
+        self.factors = [1]
+        while max(self.level_shape(self.factors[-1])) > tile_size:
+            self.factors.append(self.factors[-1] * 2)
+
+    @property
+    def shape(self):
+        return self.levels[1].shape
+
+    def level_shape(self, factor):
+        return tuple(max(1, size // factor) for size in self.shape)
+
+    def factor_for(self, pixels_per_screen_pixel):
+        """
+        The coarsest level that still has at least one of its pixels per
+        screen pixel, for a view showing pixels_per_screen_pixel pixels of
+        the image per screen pixel.
+        """
+        factors = [f for f in self.factors if f <= pixels_per_screen_pixel]
+        return max(factors, default=1)
+
+    def level(self, factor):
+        # Tiles of the levels already built don't wait for a level being built
+        level = self.levels.get(factor)
+        if level is not None:
+            return level
+        with self.lock:
+            if factor not in self.levels:
+                self.levels[factor] = downsample_image(self.level(factor // 2))
+            return self.levels[factor]
+
+    def tile_count(self, factor):
+        """The number of tiles of a level along each axis."""
+        return tuple(-(-size // self.tile_size) for size in self.level_shape(factor))
+
+    def tiles_in(self, factor, x_range, y_range):
+        """The (tx, ty) of the tiles of a level within an image region."""
+        tile_extent = self.tile_size * factor
+        x_count, y_count = self.tile_count(factor)
+        x_tiles = range(
+            max(0, int(x_range[0] // tile_extent)),
+            min(x_count, int(x_range[1] // tile_extent) + 1),
+        )
+        y_tiles = range(
+            max(0, int(y_range[0] // tile_extent)),
+            min(y_count, int(y_range[1] // tile_extent) + 1),
+        )
+        return [(tx, ty) for tx in x_tiles for ty in y_tiles]
+
+    def get_tile(self, factor, tx, ty):
+        """A contiguous copy of a tile of a level."""
+        level = self.level(factor)
+        size = self.tile_size
+        return np.ascontiguousarray(
+            level[tx * size : (tx + 1) * size, ty * size : (ty + 1) * size]
+        )
+
+
+def downsample_image(image):
+    """2x2 block mean of an image, cropped to even sizes, in its dtype."""
+    height, width = (max(2, size // 2 * 2) for size in image.shape)
+    image = image[:height, :width]
+    if image.shape[0] < 2 or image.shape[1] < 2:
+        return image.copy()
+
+    blocks = image.reshape(height // 2, 2, width // 2, 2).mean(
+        axis=(1, 3), dtype=np.float32
+    )
+    if np.issubdtype(image.dtype, np.integer):
+        blocks = np.rint(blocks)
+    return blocks.astype(image.dtype)
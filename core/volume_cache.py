@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.volume_statistics import VolumeStatistics
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".dicom_viewer", "cache")
+DEFAULT_SIZE_BUDGET = 8 * 1024**3  # 8 GB
+
+
+class VolumeCache:
+    """
+    On-disk cache of decoded volumes.
+
+    Entries are keyed by the source path, its modification time and its size,
+    so an edited file or series is decoded again. Each entry is a directory
+    with the volume saved as .npy (C order, so every axial slice is one
+    contiguous chunk that np.load can memory-map) and a meta.json holding the
+    spacing. An entry can also hold the pyramid levels and the statistics of
+    the volume. The least recently used entries are evicted once the cache
+    grows past its size budget.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, size_budget=DEFAULT_SIZE_BUDGET):
+        self.cache_dir = cache_dir
+        self.size_budget = size_budget
+        self.lock = threading.Lock()
+        self.pending_keys = set()
+
+        # Writes and rebuilds happen one at a time in the background
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def load(self, path):
+        """
+        Memory-map the cached volume of a path.
+
+        Returns (volume, spacing), or None if there is no valid entry.
+        """
+        try:
+            entry_dir = self.entry_dir(path)
+            meta_path = os.path.join(entry_dir, "meta.json")
+            with open(meta_path) as f:
+                meta = json.load(f)
+            volume = np.load(os.path.join(entry_dir, "volume.npy"), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        # The modification time of meta.json is the last access time of the entry
+        os.utime(meta_path)
+
+        return volume, tuple(meta["spacing"])
+
+    def load_pyramid(self, path):
+        """Memory-map the cached pyramid levels of a path, as {factor: level}."""
+        try:
+            entry_dir = self.entry_dir(path)
+            return {
+                int(name[len("level_") : -len(".npy")]): np.load(
+                    os.path.join(entry_dir, name), mmap_mode="r"
+                )
+                for name in os.listdir(entry_dir)
+                if name.startswith("level_") and name.endswith(".npy")
+            }
+        except (OSError, ValueError):
+            return {}
+
+    def load_statistics(self, path):
+        """The cached VolumeStatistics of a path, or None."""
+        try:
+            return VolumeStatistics.load(
+                os.path.join(self.entry_dir(path), "statistics.npz")
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def contains(self, path):
+        try:
+            return os.path.exists(os.path.join(self.entry_dir(path), "meta.json"))
+        except OSError:
+            return False
+
+    def store(
+        self, path, volume, spacing, pyramid_levels=None, statistics=None, evict=True
+    ):
+        """
+        Write a decoded volume to the cache, then enforce the size budget
+        unless evict is False.
+
+        pyramid_levels ({factor: level}, without the full-resolution level)
+        and statistics (a VolumeStatistics) are stored along with it if given.
+        """
+        key = self.key(path)
+        entry_dir = os.path.join(self.cache_dir, key)
+        temp_dir = entry_dir + ".tmp"
+
+        os.makedirs(temp_dir, exist_ok=True)
+        np.save(os.path.join(temp_dir, "volume.npy"), np.asarray(volume))
+        for factor, level in (pyramid_levels or {}).items():
+            np.save(os.path.join(temp_dir, f"level_{factor}.npy"), np.asarray(level))
+        if statistics is not None:
+            statistics.save(os.path.join(temp_dir, "statistics.npz"))
+        with open(os.path.join(temp_dir, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "path": os.path.abspath(path),
+                    "spacing": [float(s) for s in spacing],
+                    "shape": list(volume.shape),
+                    "dtype": str(volume.dtype),
+                },
+                f,
+            )
+
+        # Readers only ever see complete entries
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
+
+        if evict:
+            self.evict()
+
+    def store_async(self, path, volume, spacing):
+        """Write a volume to the cache without blocking the caller."""
+        return self._submit(path, lambda: self.store(path, volume, spacing))
+
+    def rebuild_async(self, path, load_function):
+        """
+        Decode and cache a path in the background if it isn't cached yet.
+
+        load_function(path) must return (volume, spacing).
+        """
+        if not os.path.exists(path) or self.contains(path):
+            return None
+
+        def rebuild():
+            if not self.contains(path):
+                volume, spacing = load_function(path)
+                self.store(path, volume, spacing)
+
+        return self._submit(path, rebuild)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its budget."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            meta_path = os.path.join(entry.path, "meta.json")
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((os.stat(meta_path).st_mtime, size, entry.path))
+            except FileNotFoundError:
+                # Incomplete, or removed by another process evicting too
+                continue
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.size_budget:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+    def entry_dir(self, path):
+        return os.path.join(self.cache_dir, self.key(path))
+
+    @staticmethod
+    def key(path):
+        """Hash of the path, its modification time and its size."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        mtime, size = stat.st_mtime_ns, stat.st_size
+
+        # A series is a directory, so its files are what changes
+        if os.path.isdir(path):
+            for entry in os.scandir(path):
+                if entry.is_file():
+                    entry_stat = entry.stat()
+                    mtime = max(mtime, entry_stat.st_mtime_ns)
+                    size += entry_stat.st_size
+
+        return hashlib.sha1(f"{path}|{mtime}|{size}".encode()).hexdigest()
+
+    def _submit(self, path, task):
+        key = self.key(path)
+        with self.lock:
+            if key in self.pending_keys:
+                return None
+            self.pending_keys.add(key)
+
+        def run():
+            try:
+                task()
+            finally:
+                with self.lock:
+                    self.pending_keys.discard(key)
+
+        return self.executor.submit(run)
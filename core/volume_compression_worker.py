@@ -0,0 +1,19 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class VolumeCompressionWorker(QThread):
+    """Compress a volume (e.g. into a ChunkedVolume) in the background."""
+
+    finished_signal = pyqtSignal(object, object)  # The volume, its compressed copy
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, volume, compress, parent=None):
+        super().__init__(parent)
+        self.volume = volume
+        self.compress = compress
+
+    def run(self):
+        try:
+            self.finished_signal.emit(self.volume, self.compress(self.volume))
+        except Exception as e:
+            self.error_signal.emit(f"Failed to compress volume: {e}")
@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from core.image_enhancer import ImageEnhancer
+
+
+class VolumeFilter:
+    """
+    Runs a filter over a whole (depth, height, width) volume, slab by slab.
+
+    Each slab of slab_size slices is read with halo slices on both sides,
+    filtered by a pool of threads, and only its own slices are written to
+    the output, so with a halo at least the radius of the filter kernel the
+    result is the same as filtering the whole volume at once. At most
+    max_in_flight slabs are read or filtered at a time, which bounds the
+    memory used besides the output.
+    """
+
+    def __init__(
+        self,
+        filter_slab,
+        halo=0,
+        dtype=np.float32,
+        slab_size=16,
+        workers=None,
+        max_in_flight=None,
+    ):
+        self.filter_slab = filter_slab
+        self.halo = halo
+        self.dtype = dtype
+        self.slab_size = slab_size
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+
+    def slabs(self, depth):
+        """The (start, stop) of the slices each slab writes."""
+        return [
+            (start, min(start + self.slab_size, depth))
+            for start in range(0, depth, self.slab_size)
+        ]
+
+    def filter(self, volume, start, stop):
+        read_start = max(0, start - self.halo)
+        read_stop = min(volume.shape[0], stop + self.halo)
+        slab = np.asarray(volume[read_start:read_stop])
+        filtered = self.filter_slab(slab)
+        return filtered[start - read_start : stop - read_start]
+
+    def run(self, volume, progress_callback=None, cancel_event=None):
+        """
+        The filtered volume, or None if cancel_event is set before it is done.
+        progress_callback(done, total) is called as slabs are done.
+        """
+        output = np.empty(volume.shape, dtype=self.dtype or volume.dtype)
+        slabs = self.slabs(volume.shape[0])
+        pending = iter(slabs)
+        in_flight = {}
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    for future in in_flight:
+                        future.cancel()
+                    return None
+
+                # Keep the pool busy without reading ahead more slabs
+                while len(in_flight) < self.max_in_flight:
+                    slab = next(pending, None)
+                    if slab is None:
+                        break
+                    in_flight[executor.submit(self.filter, volume, *slab)] = slab
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    start, stop = in_flight.pop(future)
+                    output[start:stop] = future.result()
+                    done += 1
+                    if progress_callback is not None:
+                        progress_callback(done, len(slabs))
+
+        return output
+
+
+def smoothing_filter(sigma, strength):
+    # gaussian_filter reads voxels up to int(4 * sigma + 0.5) away
+    return VolumeFilter(
+        lambda slab: ImageEnhancer.smooth_image(slab, sigma, strength),
+        halo=int(4 * sigma + 0.5),
+    )
+
+
+def sharpening_filter(strength):
+    # The sharpening kernel is 2D, so the slices are sharpened one by one
+    return VolumeFilter(
+        lambda slab: np.stack(
+            [ImageEnhancer.sharpen_image(image, strength) for image in slab]
+        ),
+    )
+
+
+def denoising_filter(filter_type, parameters):
+    if filter_type == "Median":
+        # A 3D median, which keeps the dtype of the volume
+        size = parameters[0]
+        return VolumeFilter(
+            lambda slab: ImageEnhancer.denoise(slab, filter_type, parameters),
+            halo=size // 2,
+            dtype=None,
+        )
+    # The bilateral filter runs slice by slice, as on the slices shown, which
+    # also keeps its grid small
+    return VolumeFilter(
+        lambda slab: np.stack(
+            [ImageEnhancer.denoise(image, filter_type, parameters) for image in slab]
+        ),
+    )
@@ -0,0 +1,33 @@
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class VolumeFilterWorker(QThread):
+    """Run a VolumeFilter over a volume in the background."""
+
+    progress_signal = pyqtSignal(int, int)  # Slabs filtered so far, total
+    finished_signal = pyqtSignal(object)  # The filtered volume
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, volume_filter, volume):
+        super().__init__()
+        self.volume_filter = volume_filter
+        self.volume = volume
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.wait()
+
+    def run(self):
+        try:
+            filtered_volume = self.volume_filter.run(
+                self.volume,
+                progress_callback=self.progress_signal.emit,
+                cancel_event=self.cancel_event,
+            )
+            if filtered_volume is not None:
+                self.finished_signal.emit(filtered_volume)
+        except Exception as e:
+            self.error_signal.emit(f"Failed to filter volume: {e}")
@@ -0,0 +1,92 @@
+import threading
+
+import numpy as np
+
+
+class VolumePyramid:
+    """
+    Downsampled copies of a volume (2x, 4x and 8x) for zoomed-out display.
+
+    Each level is the 2x2x2 block mean of the previous one, in the dtype of
+    the volume. The levels are built from axial slabs, so a memory-mapped
+    volume is streamed through instead of being read in full. Levels that
+    were built before (e.g. by the batch converter) can be passed in and
+    aren't built again.
+    """
+
+    FACTORS = (2, 4, 8)
+
+    def __init__(self, volume, levels=None):
+        self.levels = {1: volume}
+        self.levels.update(levels or {})
+        self.cancel_event = threading.Event()
+
+    def build(self):
+        for factor in self.FACTORS:
+            if self.cancel_event.is_set():
+                return
+            if factor in self.levels:
+                continue
+            level = downsample_volume(self.levels[factor // 2], self.cancel_event)
+            if level is None:
+                return
+            self.levels[factor] = level
+
+    def build_async(self):
+        thread = threading.Thread(target=self.build, daemon=True)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def built_levels(self):
+        """The downsampled levels built so far, {factor: level}."""
+        return {f: level for f, level in list(self.levels.items()) if f > 1}
+
+    def factor_for(self, voxels_per_pixel):
+        """
+        The coarsest built level that still has at least one of its voxels
+        per screen pixel, for a viewer showing voxels_per_pixel
+        full-resolution voxels per screen pixel.
+        """
+        factors = [f for f in list(self.levels) if f <= voxels_per_pixel]
+        return max(factors, default=1)
+
+    def get_slice(self, plane, index, factor):
+        """The slice of a level that covers the full-resolution index."""
+        level = self.levels[factor]
+        if plane == "axial":
+            return level[min(index // factor, level.shape[0] - 1), :, :]
+        elif plane == "coronal":
+            return level[:, min(index // factor, level.shape[1] - 1), :]
+        elif plane == "sagittal":
+            return level[:, :, min(index // factor, level.shape[2] - 1)]
+
+
+def downsample_volume(volume, cancel_event=None, slab_size=16):
+    """
+    2x2x2 block mean of a volume, cropped to even sizes.
+
+    Returns None if cancel_event is set before it is done.
+    """
+    depth, height, width = (size // 2 * 2 for size in volume.shape)
+    if min(depth, height, width) == 0:
+        return None
+
+    result = np.empty((depth // 2, height // 2, width // 2), dtype=volume.dtype)
+    for start in range(0, depth, slab_size):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+
+        stop = min(start + slab_size, depth)
+        slab = np.asarray(volume[start:stop, :height, :width])
+        blocks = slab.reshape(
+            (stop - start) // 2, 2, height // 2, 2, width // 2, 2
+        ).mean(axis=(1, 3, 5), dtype=np.float32)
+
+        if np.issubdtype(result.dtype, np.integer):
+            blocks = np.rint(blocks)
+        result[start // 2 : stop // 2] = blocks
+
+    return result
@@ -60,14 +60,24 @@ class VolumeRenderer:
             )
             render_window.Render()  # Force update of the render window
 
-    def create_volume_renderer(self, volume_data, spacing):
+    def create_volume_renderer(self, volume_data, spacing, intensity_range=None):
         """
         Create a volume renderer using VTK for the given 3D volume data.
+        intensity_range is its (min, max), if it is known already.
         """
-        # Convert the numpy array to a VTK image
+        # Lazily loaded volumes are read in full only here. VTK takes the
+        # voxels in their own dtype (integers stay integers) and native byte order
+        volume_data = np.ascontiguousarray(volume_data)
+        volume_data = volume_data.astype(
+            volume_data.dtype.newbyteorder("="), copy=False
+        )
+
+        # Convert the numpy array to a VTK image, sharing the numpy buffer
         vtk_image = vtk.vtkImageData()
         depth_array = numpy_support.numpy_to_vtk(
-            num_array=volume_data.ravel(), deep=True, array_type=vtk.VTK_FLOAT
+            num_array=volume_data.ravel(),
+            deep=False,
+            array_type=numpy_support.get_vtk_array_type(volume_data.dtype),
         )
         vtk_image.SetDimensions(volume_data.shape[::-1])
         vtk_image.GetPointData().SetScalars(depth_array)
@@ -98,8 +108,12 @@ class VolumeRenderer:
         render_interactor = vtk.vtkRenderWindowInteractor()
         render_interactor.SetRenderWindow(render_window)
         # Bind the contrast adjustment functionality
-        self.min_intensity = np.min(volume_data)
-        self.max_intensity = np.max(volume_data)
+        min_intensity, max_intensity = intensity_range or (
+            np.min(volume_data),
+            np.max(volume_data),
+        )
+        self.min_intensity = float(min_intensity)
+        self.max_intensity = float(max_intensity)
         render_interactor.AddObserver(
             "KeyPressEvent",
             lambda obj, event: self.adjust_contrast(
@@ -0,0 +1,185 @@
+import threading
+
+import numpy as np
+
+PLANES = ("axial", "coronal", "sagittal")
+# Histogram bins of volumes whose values don't fit a 16-bit integer range
+FLOAT_BINS = 4096
+
+
+class VolumeStatistics:
+    """
+    Intensity statistics of a volume: a global histogram (and percentiles
+    read from it) plus the min, max and mean of every slice of each plane.
+
+    They are computed from the axial slabs of the volume, so a memory-mapped
+    or compressed volume is streamed through instead of being read in full.
+    Volumes of integers of up to 16 bits get an exact histogram in the same
+    pass, anything else needs a second pass once the range is known.
+    """
+
+    def __init__(self, histogram, bin_edges, slice_min, slice_max, slice_mean):
+        self.histogram = histogram
+        self.bin_edges = bin_edges
+        self.slice_min = slice_min
+        self.slice_max = slice_max
+        self.slice_mean = slice_mean
+
+    @property
+    def min(self):
+        return float(self.slice_min["axial"].min())
+
+    @property
+    def max(self):
+        return float(self.slice_max["axial"].max())
+
+    @property
+    def mean(self):
+        return float(self.slice_mean["axial"].mean())
+
+    def percentile(self, q):
+        """The q-th percentile (0-100) of the voxel values, to the bin."""
+        cumulative = np.cumsum(self.histogram)
+        index = np.searchsorted(cumulative, q / 100 * cumulative[-1])
+        return float(self.bin_edges[min(index, len(self.histogram) - 1)])
+
+    def slice_range(self, plane, index):
+        """The (min, max) of a slice of a plane."""
+        return (
+            float(self.slice_min[plane][index]),
+            float(self.slice_max[plane][index]),
+        )
+
+    def auto_window(self, low=1, high=99):
+        """
+        A (level, width) window spanning the low-th to the high-th percentile,
+        so a few outlier voxels (metal, air) don't wash out the image.
+        """
+        lower, upper = self.percentile(low), self.percentile(high)
+        if upper <= lower:
+            lower, upper = self.min, self.max
+        return (lower + upper) / 2, max(upper - lower, 1.0)
+
+    @classmethod
+    def compute(cls, volume, slab_size=16, cancel_event=None):
+        """
+        Statistics of a (depth, height, width) volume.
+
+        Returns None if cancel_event is set before they are done.
+        """
+        depth, height, width = volume.shape
+        slice_min = {"axial": [], "coronal": None, "sagittal": None}
+        slice_max = {"axial": [], "coronal": None, "sagittal": None}
+        sums = {"axial": [], "coronal": 0.0, "sagittal": 0.0}
+
+        dtype = np.dtype(volume.dtype)
+        exact_histogram = np.issubdtype(dtype, np.integer) and dtype.itemsize <= 2
+        if exact_histogram:
+            offset = int(np.iinfo(dtype).min)
+            counts = np.zeros(int(np.iinfo(dtype).max) - offset + 1, dtype=np.int64)
+
+        for start in range(0, depth, slab_size):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+
+            slab = np.asarray(volume[start : start + slab_size])
+
+            slice_min["axial"].append(slab.min(axis=(1, 2)))
+            slice_max["axial"].append(slab.max(axis=(1, 2)))
+            sums["axial"].append(slab.sum(axis=(1, 2), dtype=np.float64))
+            for plane, axes in (("coronal", (0, 2)), ("sagittal", (0, 1))):
+                slab_min, slab_max = slab.min(axis=axes), slab.max(axis=axes)
+                if slice_min[plane] is None:
+                    slice_min[plane], slice_max[plane] = slab_min, slab_max
+                else:
+                    np.minimum(slice_min[plane], slab_min, out=slice_min[plane])
+                    np.maximum(slice_max[plane], slab_max, out=slice_max[plane])
+                sums[plane] = sums[plane] + slab.sum(axis=axes, dtype=np.float64)
+
+            if exact_histogram:
+                counts += np.bincount(
+                    (slab.astype(np.int32) - offset).ravel(), minlength=counts.size
+                )
+
+        slice_min["axial"] = np.concatenate(slice_min["axial"])
+        slice_max["axial"] = np.concatenate(slice_max["axial"])
+        slice_mean = {
+            "axial": np.concatenate(sums["axial"]) / (height * width),
+            "coronal": sums["coronal"] / (depth * width),
+            "sagittal": sums["sagittal"] / (depth * height),
+        }
+
+        low, high = slice_min["axial"].min(), slice_max["axial"].max()
+        if exact_histogram:
+            # Only keep the bins between the min and the max
+            histogram = counts[int(low) - offset : int(high) - offset + 1]
+            bin_edges = np.arange(int(low), int(high) + 2)
+        else:
+            histogram, bin_edges = cls._histogram(
+                volume, low, high, slab_size, cancel_event
+            )
+            if histogram is None:
+                return None
+
+        return cls(histogram, bin_edges, slice_min, slice_max, slice_mean)
+
+    @staticmethod
+    def _histogram(volume, low, high, slab_size, cancel_event):
+        bin_edges = np.linspace(float(low), float(high) or 1.0, FLOAT_BINS + 1)
+        histogram = np.zeros(FLOAT_BINS, dtype=np.int64)
+        for start in range(0, volume.shape[0], slab_size):
+            if cancel_event is not None and cancel_event.is_set():
+                return None, None
+            slab = np.asarray(volume[start : start + slab_size])
+            histogram += np.histogram(slab, bins=bin_edges)[0]
+        return histogram, bin_edges
+
+    def save(self, file_path):
+        arrays = {"histogram": self.histogram, "bin_edges": self.bin_edges}
+        for plane in PLANES:
+            arrays[f"{plane}_min"] = self.slice_min[plane]
+            arrays[f"{plane}_max"] = self.slice_max[plane]
+            arrays[f"{plane}_mean"] = self.slice_mean[plane]
+        np.savez(file_path, **arrays)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as arrays:
+            return cls(
+                arrays["histogram"],
+                arrays["bin_edges"],
+                {plane: arrays[f"{plane}_min"] for plane in PLANES},
+                {plane: arrays[f"{plane}_max"] for plane in PLANES},
+                {plane: arrays[f"{plane}_mean"] for plane in PLANES},
+            )
+
+
+class StatisticsBuilder:
+    """
+    Computes the statistics of a volume in the background.
+
+    statistics stays None until they are done, and if they were computed
+    before (e.g. by the batch converter) they can be passed in instead.
+    """
+
+    def __init__(self, volume, statistics=None):
+        self.volume = volume
+        self.statistics = statistics
+        self.cancel_event = threading.Event()
+
+    def build(self):
+        if self.statistics is not None:
+            return
+        statistics = VolumeStatistics.compute(
+            self.volume, cancel_event=self.cancel_event
+        )
+        if not self.cancel_event.is_set():
+            self.statistics = statistics
+
+    def build_async(self):
+        thread = threading.Thread(target=self.build, daemon=True)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        self.cancel_event.set()
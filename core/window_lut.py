@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class WindowLUT:
+    """
+    Windowing of 8 and 16-bit integer images through lookup tables.
+
+    A table maps every value the dtype can hold to its uint8 display value
+    (or RGB color, given a 256-entry colormap) for one window, so windowing
+    an image is a single take from the table, with no float temporaries.
+    Images are indexed through their unsigned view, so signed values need
+    no offset. A (slope, intercept) rescale can be folded into a table, to
+    window stored values (e.g. int16 CT) as if they were rescaled first.
+    Tables are cached per (dtype, level, width, colormap, rescale), and
+    images are windowed into a reusable output buffer per shape.
+    """
+
+    def __init__(self, max_tables=16):
+        self.max_tables = max_tables
+        self.tables = OrderedDict()
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def supports(dtype):
+        dtype = np.dtype(dtype)
+        return np.issubdtype(dtype, np.integer) and dtype.itemsize <= 2
+
+    def table(self, dtype, window_level, window_width, colormap=None, rescale=None):
+        """The lookup table of a window, indexed by the unsigned view of dtype."""
+        dtype = np.dtype(dtype).newbyteorder("=")
+        colormap_key = None if colormap is None else colormap.tobytes()
+        rescale = None if rescale is None else tuple(map(float, rescale))
+        key = (
+            dtype.str,
+            float(window_level),
+            float(window_width),
+            colormap_key,
+            rescale,
+        )
+
+        with self.lock:
+            table = self.tables.get(key)
+            if table is not None:
+                self.tables.move_to_end(key)
+                return table
+
+        # The same arithmetic as ImageEnhancer.apply_window, once per value
+        unsigned = np.dtype(f"u{dtype.itemsize}")
+        values = np.arange(2 ** (8 * dtype.itemsize)).astype(unsigned).view(dtype)
+        if rescale is not None:
+            slope, intercept = rescale
+            values = values * slope + intercept
+        lower_bound = window_level - window_width / 2
+        upper_bound = window_level + window_width / 2
+        table = np.subtract(values, lower_bound, dtype=np.float32)
+        table *= 255.0 / (upper_bound - lower_bound)
+        np.clip(table, 0, 255, out=table)
+        table = table.astype(np.uint8)
+        if colormap is not None:
+            table = np.ascontiguousarray(colormap[table])
+
+        with self.lock:
+            self.tables[key] = table
+            while len(self.tables) > self.max_tables:
+                self.tables.popitem(last=False)
+        return table
+
+    def apply(
+        self, image, window_level, window_width, colormap=None, out=None, rescale=None
+    ):
+        """
+        The windowed uint8 image (or RGB image, with a colormap), of the
+        values of image rescaled by rescale, (slope, intercept), if given.
+
+        Unless out is given, the result is written to a buffer that the next
+        call for an image of the same shape overwrites.
+        """
+        table = self.table(image.dtype, window_level, window_width, colormap, rescale)
+        if out is None:
+            out = self.buffer(image.shape + table.shape[1:])
+
+        # The unsigned view keeps the byte order of the image
+        indices = image.view(image.dtype.byteorder + f"u{image.dtype.itemsize}")
+        return np.take(table, indices, axis=0, out=out, mode="wrap")
+
+    def buffer(self, shape):
+        with self.lock:
+            buffer = self.buffers.get(shape)
+            if buffer is None:
+                buffer = self.buffers[shape] = np.empty(shape, dtype=np.uint8)
+            return buffer
+
+    def clear(self):
+        with self.lock:
+            self.tables.clear()
+            self.buffers.clear()
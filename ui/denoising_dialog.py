@@ -1,6 +1,7 @@
-from PyQt5.QtCore import QCoreApplication, QMetaObject
+from PyQt5.QtCore import QCoreApplication, QMetaObject, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtWidgets import (
+    QCheckBox,
     QComboBox,
     QDialog,
     QDoubleSpinBox,
@@ -15,6 +16,9 @@ from PyQt5.QtWidgets import (
 
 
 class DenoisingDialogUI(QDialog):
+    # Emitted whenever the filter or one of its parameters changes
+    parameters_changed = pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setupUi(self)
@@ -73,6 +77,11 @@ class DenoisingDialogUI(QDialog):
         self.sigma_spatial_layout.addWidget(self.sigma_spatial_spinbox)
         self.mainLayout.addLayout(self.sigma_spatial_layout)
 
+        # Filter the whole volume instead of the slices shown
+        self.volume_checkbox = QCheckBox("Whole volume")
+        self.volume_checkbox.setFont(self.font)
+        self.mainLayout.addWidget(self.volume_checkbox)
+
         # Buttons
         self.horizontalLayout = QHBoxLayout()
         self.horizontalLayout.setObjectName("horizontalLayout")
@@ -89,6 +98,10 @@ class DenoisingDialogUI(QDialog):
         # Connect signals
         self.applyWindowingButton.clicked.connect(self.accept)
         self.filtersComboBox.currentIndexChanged.connect(self.update_parameters)
+        self.filtersComboBox.currentIndexChanged.connect(self.parameters_changed)
+        self.kernel_spinbox.valueChanged.connect(self.parameters_changed)
+        self.sigma_color_spinbox.valueChanged.connect(self.parameters_changed)
+        self.sigma_spatial_spinbox.valueChanged.connect(self.parameters_changed)
 
         # Initialize visibility
         self.update_parameters()
@@ -138,6 +151,9 @@ class DenoisingDialogUI(QDialog):
             sigma_spatial = self.sigma_spatial_spinbox.value()
             return current_filter, [sigma_color, sigma_spatial]
 
+    def applies_to_volume(self):
+        return self.volume_checkbox.isChecked()
+
     def retranslateUi(self, DenoisingDialog):
         _translate = QCoreApplication.translate
         DenoisingDialog.setWindowTitle(
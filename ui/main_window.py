@@ -244,6 +244,26 @@ class MainWindowUI(object):
         self.reload_button.setIconSize(QtCore.QSize(24, 24))
         self.ortho_toolbar.addWidget(self.reload_button)
 
+        # Cine playback of the chosen plane
+        self.cine_button = QtWidgets.QPushButton()
+        self.cine_button.setIcon(
+            MainWindow.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay)
+        )
+        self.cine_button.setIconSize(QtCore.QSize(24, 24))
+        self.cine_button.setCheckable(True)
+        self.cine_button.setToolTip("Cine")
+        self.ortho_toolbar.addWidget(self.cine_button)
+
+        self.cine_plane_combo_box = QtWidgets.QComboBox()
+        self.cine_plane_combo_box.addItems(["Axial", "Sagittal", "Coronal"])
+        self.ortho_toolbar.addWidget(self.cine_plane_combo_box)
+
+        self.cine_fps_spinbox = QtWidgets.QSpinBox()
+        self.cine_fps_spinbox.setRange(1, 60)
+        self.cine_fps_spinbox.setValue(20)
+        self.cine_fps_spinbox.setSuffix(" fps")
+        self.ortho_toolbar.addWidget(self.cine_fps_spinbox)
+
         # Add a horizontal spacer
         spacer = QtWidgets.QWidget()
         spacer.setSizePolicy(
@@ -283,6 +303,10 @@ class MainWindowUI(object):
         self.actionImport_png = QtWidgets.QAction(MainWindow)
         self.actionImport_png.setObjectName("actionImport_png")
         self.actionImport_png.setShortcut("Ctrl+I")
+        self.actionIndex_DICOM_Folder = QtWidgets.QAction(MainWindow)
+        self.actionIndex_DICOM_Folder.setObjectName("actionIndex_DICOM_Folder")
+        self.actionOpen_Indexed_Series = QtWidgets.QAction(MainWindow)
+        self.actionOpen_Indexed_Series.setObjectName("actionOpen_Indexed_Series")
         self.actionQuit_App.setObjectName("actionQuit_App")
         self.actionQuit_App.setShortcut("Ctrl+Q")
 
@@ -292,6 +316,9 @@ class MainWindowUI(object):
         self.menuFile.addAction(self.actionImport_DICOM_Series)
         self.menuFile.addAction(self.actionImport_png)
         self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionIndex_DICOM_Folder)
+        self.menuFile.addAction(self.actionOpen_Indexed_Series)
+        self.menuFile.addSeparator()
         self.menuFile.addAction(self.actionQuit_App)
 
         ### View Menu ###
@@ -355,6 +382,9 @@ class MainWindowUI(object):
         self.actionWindowing = QtWidgets.QAction(MainWindow)
         self.actionWindowing.setObjectName("actionWindowing")
         self.menuImage.addAction(self.actionWindowing)
+        self.actionSlab_Projection = QtWidgets.QAction(MainWindow)
+        self.actionSlab_Projection.setObjectName("actionSlab_Projection")
+        self.menuImage.addAction(self.actionSlab_Projection)
         # Filters menu inside Image menu
         self.subMenuFilters = QtWidgets.QMenu(self.menuImage)
         self.subMenuFilters.setObjectName("subMenuFilters")
@@ -426,12 +456,19 @@ class MainWindowUI(object):
             _translate("MainWindow", "Import DICOM Series")
         )
         self.actionImport_png.setText(_translate("MainWindow", "Import PNG/JPG"))
+        self.actionIndex_DICOM_Folder.setText(
+            _translate("MainWindow", "Index DICOM Folder")
+        )
+        self.actionOpen_Indexed_Series.setText(
+            _translate("MainWindow", "Open Indexed Series")
+        )
         self.actionQuit_App.setText(_translate("MainWindow", "Quit App"))
         self.actionRuler.setText(_translate("MainWindow", "Ruler"))
         self.showRuler.setText(_translate("MainWindow", "Show Ruler"))
         self.actionAngle.setText(_translate("MainWindow", "Angle"))
         self.showAngle.setText(_translate("MainWindow", "Show Angle"))
         self.actionWindowing.setText(_translate("MainWindow", "Windowing"))
+        self.actionSlab_Projection.setText(_translate("MainWindow", "Slab Projection"))
         self.actionSmoothing.setText(_translate("MainWindow", "Smoothing"))
         self.actionSharpening.setText(_translate("MainWindow", "Sharpening"))
         self.actionDenoising.setText(_translate("MainWindow", "Denoising"))
@@ -0,0 +1,99 @@
+from PyQt5.QtCore import QCoreApplication, QMetaObject
+from PyQt5.QtGui import QFont, QIcon
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QDoubleSpinBox,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QSizePolicy,
+    QSpacerItem,
+    QVBoxLayout,
+)
+
+
+class SlabProjectionDialogUI(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setupUi(self)
+
+    def setupUi(self, SlabDialog):
+        SlabDialog.setObjectName("SlabDialog")
+        SlabDialog.resize(295, 160)
+        self.setWindowIcon(QIcon("assets/icons/logo.png"))
+
+        self.font = QFont("Poppins", 9)
+        self.setFont(self.font)
+
+        self.mainLayout = QVBoxLayout(SlabDialog)
+        self.mainLayout.setObjectName("mainLayout")
+
+        # Plane the slab is shown in
+        self.plane_layout = QHBoxLayout()
+        self.plane_label = QLabel(SlabDialog)
+        self.plane_combo_box = QComboBox(SlabDialog)
+        self.plane_combo_box.addItems(["All", "Axial", "Sagittal", "Coronal"])
+        self.plane_layout.addWidget(self.plane_label)
+        self.plane_layout.addWidget(self.plane_combo_box)
+        self.mainLayout.addLayout(self.plane_layout)
+
+        # Projection mode, Off shows single slices again
+        self.mode_layout = QHBoxLayout()
+        self.mode_label = QLabel(SlabDialog)
+        self.mode_combo_box = QComboBox(SlabDialog)
+        self.mode_combo_box.addItems(["MIP", "MinIP", "Average", "Off"])
+        self.mode_layout.addWidget(self.mode_label)
+        self.mode_layout.addWidget(self.mode_combo_box)
+        self.mainLayout.addLayout(self.mode_layout)
+
+        # Slab thickness in mm
+        self.thickness_layout = QHBoxLayout()
+        self.thickness_label = QLabel(SlabDialog)
+        self.thickness_spinbox = QDoubleSpinBox(SlabDialog)
+        self.thickness_spinbox.setMinimum(1.0)
+        self.thickness_spinbox.setMaximum(200.0)
+        self.thickness_spinbox.setValue(10.0)
+        self.thickness_spinbox.setSuffix(" mm")
+        self.thickness_layout.addWidget(self.thickness_label)
+        self.thickness_layout.addWidget(self.thickness_spinbox)
+        self.mainLayout.addLayout(self.thickness_layout)
+
+        # Buttons
+        self.horizontalLayout = QHBoxLayout()
+        spacerItem = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.applySlabButton = QPushButton(SlabDialog)
+        self.applySlabButton.setObjectName("applySlabButton")
+        self.horizontalLayout.addWidget(self.applySlabButton)
+        self.mainLayout.addLayout(self.horizontalLayout)
+
+        self.retranslateUi(SlabDialog)
+        QMetaObject.connectSlotsByName(SlabDialog)
+
+        # Connect signals
+        self.applySlabButton.clicked.connect(self.accept)
+        self.mode_combo_box.currentIndexChanged.connect(self.update_parameters)
+
+    def update_parameters(self):
+        self.thickness_spinbox.setEnabled(self.mode_combo_box.currentText() != "Off")
+
+    def get_parameters(self):
+        """
+        Get the planes, the projection mode (None for Off) and the thickness.
+
+        Returns:
+            Tuple[list, str, float]: Planes, mode and thickness in mm.
+        """
+        plane = self.plane_combo_box.currentText().lower()
+        planes = ["axial", "sagittal", "coronal"] if plane == "all" else [plane]
+        mode = self.mode_combo_box.currentText()
+        return planes, None if mode == "Off" else mode, self.thickness_spinbox.value()
+
+    def retranslateUi(self, SlabDialog):
+        _translate = QCoreApplication.translate
+        SlabDialog.setWindowTitle(_translate("SlabDialog", "Slab Projection"))
+        self.plane_label.setText(_translate("SlabDialog", "Plane"))
+        self.mode_label.setText(_translate("SlabDialog", "Projection"))
+        self.thickness_label.setText(_translate("SlabDialog", "Thickness"))
+        self.applySlabButton.setText(_translate("SlabDialog", "Apply"))
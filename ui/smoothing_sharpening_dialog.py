@@ -1,6 +1,7 @@
-from PyQt5.QtCore import QCoreApplication, QMetaObject
+from PyQt5.QtCore import QCoreApplication, QMetaObject, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtWidgets import (
+    QCheckBox,
     QComboBox,
     QDialog,
     QDoubleSpinBox,
@@ -15,6 +16,9 @@ from PyQt5.QtWidgets import (
 
 
 class SmoothingAndSharpeningDialogUI(QDialog):
+    # Emitted whenever one of the parameters changes
+    parameters_changed = pyqtSignal()
+
     def __init__(self, mode, parent=None):
         super().__init__(parent)
         self.mode = mode
@@ -38,6 +42,11 @@ class SmoothingAndSharpeningDialogUI(QDialog):
             SmoothingSharpeningDialog.setObjectName("Sharpening")
             self.setup_sharpening()
 
+        # Filter the whole volume instead of the slices shown
+        self.volume_checkbox = QCheckBox("Whole volume")
+        self.volume_checkbox.setFont(self.font)
+        self.mainLayout.addWidget(self.volume_checkbox)
+
         self.horizontalLayout = QHBoxLayout()
         self.horizontalLayout.setObjectName("horizontalLayout")
         spacerItem = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
@@ -53,6 +62,15 @@ class SmoothingAndSharpeningDialogUI(QDialog):
 
         # Connect signals
         self.applyWindowingButton.clicked.connect(self.accept)
+        if self.mode == "Smoothing":
+            self.sigma_spinbox.valueChanged.connect(self.parameters_changed)
+            self.smoothing_strength_spinbox.valueChanged.connect(
+                self.parameters_changed
+            )
+        elif self.mode == "Sharpening":
+            self.sharpening_strength_spinbox.valueChanged.connect(
+                self.parameters_changed
+            )
 
     def setup_smoothing(self):
         # Sigma
@@ -104,6 +122,9 @@ class SmoothingAndSharpeningDialogUI(QDialog):
         elif mode == "Sharpening":
             return self.sharpening_strength_spinbox.value()
 
+    def applies_to_volume(self):
+        return self.volume_checkbox.isChecked()
+
     def retranslateUi(self, SmoothingSharpeningDialog):
         _translate = QCoreApplication.translate
         if self.mode == "Smoothing":
@@ -2,6 +2,9 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 
 class WindowingDialogUI(QtWidgets.QDialog):
+    # Emitted whenever the level or the width changes
+    parameters_changed = QtCore.pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setupUi(self)
@@ -59,6 +62,8 @@ class WindowingDialogUI(QtWidgets.QDialog):
 
         # Connect the apply button to accept the dialog
         self.applyWindowingButton.clicked.connect(self.accept)
+        self.windowLevelDoubleSpinBox.valueChanged.connect(self.parameters_changed)
+        self.windowWidthDoubleSpinBox.valueChanged.connect(self.parameters_changed)
 
     def get_parameters(self):
         return (
@@ -66,6 +71,19 @@ class WindowingDialogUI(QtWidgets.QDialog):
             self.windowWidthDoubleSpinBox.value(),
         )
 
+    def set_intensity_range(self, min_value, max_value):
+        """
+        Let the level span the intensities of the image (negative for CT),
+        and the width go up to twice their range.
+        """
+        span = max(float(max_value) - float(min_value), 1.0)
+        self.windowLevelDoubleSpinBox.setRange(float(min_value), float(max_value))
+        self.windowWidthDoubleSpinBox.setRange(1.0, 2 * span)
+
+    def set_parameters(self, window_level, window_width):
+        self.windowLevelDoubleSpinBox.setValue(window_level)
+        self.windowWidthDoubleSpinBox.setValue(window_width)
+
     def retranslateUi(self, WindowingDialog):
         _translate = QtCore.QCoreApplication.translate
         WindowingDialog.setWindowTitle(
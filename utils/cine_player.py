@@ -0,0 +1,93 @@
+import time
+
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+
+
+class CinePlayer(QObject):
+    """
+    Plays the slices of a plane in a loop at a target frame rate.
+
+    Frames are timed from the start of the playback, so a frame that comes
+    too late is dropped instead of slowing the loop down. Each frame is
+    taken from the prefetcher if it is ready, and passed to
+    show_frame(plane, index, frame), with frame None if it wasn't.
+    Twice a second, stats_updated gives the achieved frame rate, the frames
+    dropped so far and the prefetch hit rate. If the prefetcher failed to
+    read a frame, playback stops at it and failed gives the error.
+    """
+
+    stats_updated = pyqtSignal(float, int, float)
+    failed = pyqtSignal(str)
+
+    STATS_INTERVAL = 0.5
+
+    def __init__(self, show_frame, parent=None):
+        super().__init__(parent)
+        self.show_frame = show_frame
+        self.prefetcher = None
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    @property
+    def is_playing(self):
+        return self.timer.isActive()
+
+    def start(self, plane, slice_count, first_index, fps, prefetcher=None):
+        self.stop()
+        self.plane = plane
+        self.slice_count = slice_count
+        self.first_index = first_index
+        self.fps = fps
+        self.prefetcher = prefetcher
+        if prefetcher is not None:
+            prefetcher.start()
+
+        self.start_time = time.perf_counter()
+        self.shown_frame = -1
+        self.dropped_frames = 0
+        self.stats_time = self.start_time
+        self.stats_frames = 0
+
+        # Twice per frame, so frames are shown within half a frame of their time
+        self.timer.start(max(1, int(500 / fps)))
+        self.tick()
+
+    def stop(self):
+        self.timer.stop()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+            self.prefetcher = None
+
+    def tick(self):
+        now = time.perf_counter()
+        frame_number = int((now - self.start_time) * self.fps)
+        if frame_number <= self.shown_frame:
+            return
+
+        # The frames whose time went by while the last one was shown
+        self.dropped_frames += frame_number - self.shown_frame - 1
+        self.shown_frame = frame_number
+
+        frame = None
+        if self.prefetcher is not None:
+            frame = self.prefetcher.take(frame_number)
+            if frame is None and self.prefetcher.error is not None:
+                error = self.prefetcher.error
+                self.stop()
+                self.failed.emit(str(error))
+                return
+        index = (self.first_index + frame_number) % self.slice_count
+        self.show_frame(self.plane, index, frame)
+        self.stats_frames += 1
+
+        if now - self.stats_time >= self.STATS_INTERVAL:
+            hit_rate = self.prefetcher.hit_rate if self.prefetcher else 0.0
+            self.stats_updated.emit(
+                self.stats_frames / (now - self.stats_time),
+                self.dropped_frames,
+                hit_rate,
+            )
+            self.stats_time = now
+            self.stats_frames = 0
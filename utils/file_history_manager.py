@@ -4,9 +4,11 @@ from PyQt5.QtWidgets import QAction
 
 
 class FileHistoryManager:
-    def __init__(self, menu, import_callback):
+    def __init__(self, menu, import_callback, cache_callback=None):
         self.menu = menu
         self.import_callback = import_callback
+        # Called with (path, type) for every entry to keep its decoded cache warm
+        self.cache_callback = cache_callback
         self.loaded_paths_history = {}
 
     def add_to_history(self, file_path, file_type):
@@ -33,3 +35,6 @@ class FileHistoryManager:
                 )
             )
             self.menu.addAction(history_action)
+
+            if self.cache_callback is not None:
+                self.cache_callback(file_path, file_type)
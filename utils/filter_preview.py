@@ -0,0 +1,129 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class FilterPreview(QObject):
+    """
+    Live preview of a processing chain in the viewers while a dialog is open.
+
+    Each change of the parameters is shown in two passes. First the part of
+    each slice in view, downsampled to at most PREVIEW_SIZE pixels a side,
+    is filtered right away. Then, once the parameters stay the same for
+    REFINE_DELAY ms, the full slices are filtered in a background thread
+    and replace the approximation. A new change drops the pending full
+    resolution job, and the result of one already running is ignored.
+
+    The chain is the one the dialog would set, ((name, parameters), ...).
+    Previews run it through the processing pipeline of the backend, and the
+    full-resolution results are cached by it, so applying the previewed
+    parameters is a lookup and only reruns the stages they changed.
+    """
+
+    PREVIEW_SIZE = 256
+    REFINE_DELAY = 150
+
+    refined = pyqtSignal(object)
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.generation = 0
+        self.stages = ()
+        self.future = None
+        # Planes showing a preview instead of their slice
+        self.previewed = set()
+
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.setInterval(self.REFINE_DELAY)
+        self.refine_timer.timeout.connect(self.refine)
+        self.refined.connect(self.show_refined)
+
+    def update(self, stages):
+        self.cancel()
+        self.stages = stages
+
+        for plane, viewer in self.backend.viewers.items():
+            slice_data = self.backend.image_processor.get_slice(plane)
+            if slice_data is None:
+                continue
+            self.show_approximation(plane, viewer, slice_data)
+        self.refine_timer.start()
+
+    def show_approximation(self, plane, viewer, slice_data):
+        # The slice in the (x, y) order of the viewer, cropped to the view
+        display = np.rot90(slice_data, k=2).T
+        (x0, x1), (y0, y1) = self.backend.views[plane].viewRange()
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1 = min(display.shape[0], math.ceil(x1))
+        y1 = min(display.shape[1], math.ceil(y1))
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        factor = max(1, math.ceil(max(x1 - x0, y1 - y0) / self.PREVIEW_SIZE))
+        region = np.ascontiguousarray(display[x0:x1:factor, y0:y1:factor])
+        pipeline = self.backend.processing_pipeline
+        image = pipeline.apply(region, self.stages, factor)
+        levels = pipeline.levels(self.stages) or (image.min(), image.max())
+        viewer.setImage(
+            image,
+            autoRange=False,
+            autoLevels=False,
+            levels=(float(levels[0]), float(levels[1])),
+            autoHistogramRange=True,
+            pos=(x0, y0),
+            scale=(factor, factor),
+        )
+        # The viewer no longer shows what its display key says
+        self.backend.rendered_keys.pop(plane, None)
+        self.previewed.add(plane)
+
+    def refine(self):
+        image_processor = self.backend.image_processor
+        jobs = []
+        for plane in self.backend.viewers:
+            slice_data = image_processor.get_slice(plane)
+            if slice_data is not None:
+                jobs.append((plane, image_processor.slice_key(plane), slice_data))
+        self.future = self.executor.submit(
+            self.process_slices, self.generation, jobs, self.stages
+        )
+
+    def process_slices(self, generation, jobs, stages):
+        # Runs in the worker thread
+        pipeline = self.backend.processing_pipeline
+        for plane, slice_key, slice_data in jobs:
+            if generation != self.generation:
+                return
+            image = pipeline.process(slice_key, lambda: slice_data, stages)
+            self.refined.emit((generation, plane, image))
+
+    def show_refined(self, result):
+        generation, plane, image = result
+        if generation == self.generation:
+            levels = self.backend.processing_pipeline.levels(self.stages)
+            self.backend.render_slice(self.backend.viewers[plane], image, levels=levels)
+
+    def cancel(self):
+        """Drop the pending full-resolution job, and ignore a running one."""
+        self.generation += 1
+        self.refine_timer.stop()
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+
+    def finish(self, applied):
+        """Stop previewing, showing the slices again unless the filter is applied."""
+        self.cancel()
+        if not applied:
+            for plane in self.previewed:
+                self.backend.render_plane(plane)
+        self.previewed.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
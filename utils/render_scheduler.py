@@ -0,0 +1,62 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QGuiApplication
+
+
+class RenderScheduler(QObject):
+    """
+    Coalesces render requests into at most one redraw per display frame.
+
+    Deferred callbacks (e.g. the handling of a mouse move) are keyed, so only
+    the last one of each key runs in a frame. Planes are marked dirty instead
+    of being rendered right away, and each dirty plane is passed once per
+    frame to render_callback, which decides whether its image really changed.
+    """
+
+    def __init__(self, render_callback, frame_interval=None, parent=None):
+        super().__init__(parent)
+        self.render_callback = render_callback
+
+        if frame_interval is None:
+            # One frame of the monitor, 60 Hz if it is unknown
+            screen = QGuiApplication.primaryScreen()
+            refresh_rate = screen.refreshRate() if screen is not None else 0
+            frame_interval = 1000 / refresh_rate if refresh_rate > 0 else 1000 / 60
+        self.frame_interval = frame_interval
+
+        self.dirty_planes = set()
+        self.deferred = {}
+        self.last_frame_time = 0.0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def mark_dirty(self, *planes):
+        self.dirty_planes.update(planes)
+        self.schedule()
+
+    def defer(self, key, callback):
+        """Run callback in the next frame, replacing the pending one of key."""
+        self.deferred[key] = callback
+        self.schedule()
+
+    def schedule(self):
+        if self.timer.isActive():
+            return
+        # Right away when idle, otherwise once the current frame is over
+        elapsed = (time.perf_counter() - self.last_frame_time) * 1000
+        self.timer.start(int(max(0, self.frame_interval - elapsed)))
+
+    def flush(self):
+        self.last_frame_time = time.perf_counter()
+
+        # The callbacks can mark planes dirty for this same frame
+        deferred, self.deferred = self.deferred, {}
+        for callback in deferred.values():
+            callback()
+
+        dirty_planes, self.dirty_planes = self.dirty_planes, set()
+        for plane in dirty_planes:
+            self.render_callback(plane)
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QRectF, pyqtSignal
+from pyqtgraph import ImageItem
+
+from core.display_cache import DisplayCache
+from core.tile_pyramid import TilePyramid
+
+
+class TiledImageDisplay(QObject):
+    """
+    Shows a large 2D image in a ViewBox as tiles of a TilePyramid.
+
+    Only the tiles that intersect the view range are shown, from the level
+    matching the zoom, each as its own ImageItem, so zooming and panning
+    cost about as much as the screen size, whatever the image size. Tiles
+    are read by a pool of worker threads into an LRU cache (a DisplayCache),
+    and the tiles shown before stay in place until the new ones are ready.
+    Tiles are read from the pyramid they were requested from and cached by
+    the generation of the image, so a new image never gets the old tiles.
+    """
+
+    tile_ready = pyqtSignal(object)
+
+    def __init__(self, view, tile_size=512, cache_budget=256 * 1024**2, workers=4):
+        super().__init__(view)
+        self.view = view
+        self.tile_size = tile_size
+        self.tile_cache = DisplayCache(plane_budget=cache_budget)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.pyramid = None
+        # The (min, max) of the image, and the levels it is shown with
+        self.image_levels = None
+        self.levels = None
+        self.generation = 0
+        self.items = {}
+        self.pending = set()
+        self.wanted = set()
+
+        self.tile_ready.connect(self.on_tile_ready)
+        self.view.sigRangeChanged.connect(self.update_tiles)
+
+    @property
+    def is_active(self):
+        return self.pyramid is not None
+
+    def set_image(self, image, levels):
+        """Show an image, given in display orientation (x, y)."""
+        self.clear()
+        self.pyramid = TilePyramid(image, self.tile_size)
+        # The levels of the whole image, so that tiles match each other
+        self.image_levels = self.levels = levels
+        self.update_tiles()
+
+    def set_levels(self, levels):
+        """Show the image with other (min, max) levels, e.g. for a window."""
+        self.levels = (float(levels[0]), float(levels[1]))
+        for item in self.items.values():
+            item.setLevels(self.levels)
+
+    def clear(self):
+        self.generation += 1
+        self.pyramid = None
+        self.image_levels = self.levels = None
+        for item in self.items.values():
+            self.view.removeItem(item)
+        self.items.clear()
+        self.pending.clear()
+        self.wanted.clear()
+        self.tile_cache.clear()
+
+    def update_tiles(self, *args):
+        if self.pyramid is None:
+            return
+
+        pixel_size = self.view.viewPixelSize()
+        factor = self.pyramid.factor_for(min(pixel_size))
+        x_range, y_range = self.view.viewRange()
+        self.wanted = {
+            (factor, tx, ty)
+            for tx, ty in self.pyramid.tiles_in(factor, x_range, y_range)
+        }
+
+        for key in self.wanted:
+            if key in self.items:
+                continue
+            cached = self.tile_cache.get("tiles", (self.generation, key))
+            if cached is not None:
+                self.show_tile(key, cached[0])
+            elif (self.generation, key) not in self.pending:
+                self.pending.add((self.generation, key))
+                self.executor.submit(
+                    self.read_tile,
+                    self.generation,
+                    self.pyramid,
+                    self.image_levels,
+                    key,
+                )
+
+        self.remove_unwanted_tiles()
+
+    def read_tile(self, generation, pyramid, levels, key):
+        # Runs in a worker thread, on the pyramid of the image it was wanted for
+        if generation != self.generation or key not in self.wanted:
+            self.pending.discard((generation, key))
+            return
+        tile = pyramid.get_tile(*key)
+        self.tile_cache.put("tiles", (generation, key), tile, levels)
+        self.tile_ready.emit((generation, key))
+
+    def on_tile_ready(self, result):
+        generation, key = result
+        self.pending.discard((generation, key))
+        if generation != self.generation or key not in self.wanted:
+            return
+        cached = self.tile_cache.get("tiles", (generation, key))
+        if cached is not None:
+            self.show_tile(key, cached[0])
+        self.remove_unwanted_tiles()
+
+    def show_tile(self, key, tile):
+        factor, tx, ty = key
+        item = ImageItem(tile, levels=self.levels, autoLevels=False)
+        extent = self.tile_size * factor
+        item.setRect(
+            QRectF(
+                tx * extent, ty * extent, tile.shape[0] * factor, tile.shape[1] * factor
+            )
+        )
+        # Finer tiles are drawn over the coarser ones still shown
+        item.setZValue(-factor)
+        self.view.addItem(item)
+        self.items[key] = item
+
+    def remove_unwanted_tiles(self):
+        # Tiles of another zoom or place go once all the wanted ones are shown
+        if not self.wanted.issubset(self.items):
+            return
+        for key in list(self.items):
+            if key not in self.wanted:
+                self.view.removeItem(self.items.pop(key))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
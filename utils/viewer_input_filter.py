@@ -0,0 +1,49 @@
+from PyQt5.QtCore import QEvent, QObject, Qt, pyqtSignal
+
+
+class ViewerInputFilter(QObject):
+    """
+    Turns the mouse wheel and the arrow keys over a viewer into slice steps.
+
+    Installed on the graphics view of an ImageView and on its viewport, it
+    takes these events before the view handles them:
+    - Wheel, Up/Down (one slice) and Page Up/Page Down (ten slices) emit
+      stepped with the number of slices.
+    - Shift + wheel emits rotated with degrees, to turn the crosshairs.
+    - Ctrl + wheel is left to the view, which zooms.
+    """
+
+    stepped = pyqtSignal(int)
+    rotated = pyqtSignal(float)
+
+    # Degrees per notch of a standard mouse wheel
+    DEGREES_PER_NOTCH = 2.0
+    KEY_STEPS = {Qt.Key_Up: 1, Qt.Key_Down: -1, Qt.Key_PageUp: 10, Qt.Key_PageDown: -10}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Touchpads send fractions of a notch
+        self.wheel_remainder = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Wheel:
+            modifiers = event.modifiers()
+            if modifiers & Qt.ControlModifier:
+                return False
+            if modifiers & Qt.ShiftModifier:
+                # Some platforms turn a vertical wheel into a horizontal one
+                delta = event.angleDelta().y() or event.angleDelta().x()
+                self.rotated.emit(delta / 120 * self.DEGREES_PER_NOTCH)
+                return True
+
+            self.wheel_remainder += event.angleDelta().y()
+            steps = int(self.wheel_remainder / 120)
+            if steps:
+                self.wheel_remainder -= steps * 120
+                self.stepped.emit(steps)
+            return True
+
+        if event.type() == QEvent.KeyPress and event.key() in self.KEY_STEPS:
+            self.stepped.emit(self.KEY_STEPS[event.key()])
+            return True
+        return super().eventFilter(obj, event)